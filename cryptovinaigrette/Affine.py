@@ -3,21 +3,24 @@ Generate an invertible Affine function.
 '''
 
 # -------------------- Imports -------------------- #
-import secrets, dill
+import secrets, dill, numpy as np
 from multiprocessing import Process, Pipe
 from datetime import datetime as dt
 from .GF256 import *
+from .GF256np import *
+from .FieldRandom import *
 
 # -------------------- Module -------------------- #
 class Affine:
-    def __init__(self, m, k, seed=666, verbosity=False):
+    def __init__(self, m, k, seed=666, verbosity=False, field=GF256):
         self.m = int(m)
         self.n = int(m)
         self.k = int(k)
         self.seed = secrets.randbelow(seed)
         self.verbosity = verbosity
+        self.field = field
 
-    def generator(m, n, k, endPoint):
+    def generator(m, n, k, endPoint, field=GF256):
         import secrets, dill, numpy as np
         from numpy.linalg import LinAlgError
 
@@ -30,14 +33,10 @@ class Affine:
 
         iters = 0
         while True:
-            l = list()
-            for i in range(m):
-                l.append(list())
-                for j in range(n):
-                    l[-1].append(GF256.get())
+            l = field.fromarray(field_random.elements((m, n), nonzero=True))
             
             try:
-                linv = GF256.find_inverse(l)
+                linv = field.find_inverse(l)
                 #print("tried : ",linv)
                 break
             except Exception as e:
@@ -46,9 +45,7 @@ class Affine:
                     print(iters, "done")
                 pass
                 
-        b = list()
-        for i in range(m):
-            b.append(GF256.get())
+        b = field.fromarray(field_random.elements(m, nonzero=True))
 
         ret = dict()
         ret['l'] = l
@@ -58,6 +55,69 @@ class Affine:
         endPoint.send(dill.dumps(ret))
         exit(0)
     
+    def random_elements(shape, rng=field_random):
+        '''
+        Uniformly random field elements as a uint8 array of the given shape.
+        '''
+        return rng.elements(shape)
+
+    def invert_unit_lower(lower):
+        '''
+        Invert a unit lower triangular matrix by forward substitution.
+        '''
+        n = len(lower)
+        ret = np.zeros((n, n), dtype=np.uint8)
+        for i in range(n):
+            ret[i] = np.bitwise_xor.reduce(GF256np.products[lower[i, :i, None], ret[:i]], axis=0)
+            ret[i, i] ^= 1
+        return ret
+
+    def invert_unit_upper(upper):
+        '''
+        Invert a unit upper triangular matrix by backward substitution.
+        '''
+        n = len(upper)
+        ret = np.zeros((n, n), dtype=np.uint8)
+        for i in range(n - 1, -1, -1):
+            ret[i] = np.bitwise_xor.reduce(GF256np.products[upper[i, i+1:, None], ret[i+1:]], axis=0)
+            ret[i, i] ^= 1
+        return ret
+
+    def generate(self, rng=field_random):
+        '''
+        Generate a random invertible affine function in this process, without rejection.
+        All randomness is drawn from rng, a `FieldRandom`.
+
+        The matrix is built as L = P * Lo * D * Up from a random permutation P, random unit
+        lower and upper triangular Lo and Up and a random non singular diagonal D, so its
+        inverse Up^(-1) * D^(-1) * Lo^(-1) * P^T follows directly from the factors.
+
+        Returns the same dictionary as `retrieve`.
+        '''
+        m = self.m
+
+        lower = np.tril(Affine.random_elements((m, m), rng), -1)
+        lower[np.arange(m), np.arange(m)] = 1
+        upper = np.triu(Affine.random_elements((m, m), rng), 1)
+        upper[np.arange(m), np.arange(m)] = 1
+        diagonal = rng.elements(m, nonzero=True)
+        perm = rng.permutation(m)
+
+        # A = Lo * D * Up, L = P * A i.e. the rows of A in permuted order
+        a = GF256np.multiply_matrices(lower, GF256np.products[diagonal[:, None], upper])
+        l = a[perm]
+
+        # A^(-1) = Up^(-1) * D^(-1) * Lo^(-1), L^(-1) = A^(-1) * P^T i.e. the columns of A^(-1) permuted
+        ainv = GF256np.products[GF256np.inverses[diagonal][:, None], Affine.invert_unit_lower(lower)]
+        ainv = GF256np.multiply_matrices(Affine.invert_unit_upper(upper), ainv)
+        linv = ainv[:, perm]
+
+        ret = dict()
+        ret['l'] = self.field.fromarray(l)
+        ret['linv'] = self.field.fromarray(linv)
+        ret['b'] = self.field.fromarray(Affine.random_elements((m,), rng))
+        return ret
+
     def start_generators(self, n):
         '''
         Use `n` subprocesses to generate a random affine function.
@@ -67,7 +127,7 @@ class Affine:
         self.childEnds = list()
         for c in range(n):
             parentEnd, childEnd = Pipe()
-            p = Process(target=Affine.generator, args=(self.m, self.n, self.k, childEnd))
+            p = Process(target=Affine.generator, args=(self.m, self.n, self.k, childEnd, self.field))
             self.children.append(p)
             self.parentEnds.append(parentEnd)
             self.childEnds.append(childEnd)
@@ -100,8 +160,7 @@ if __name__ == '__main__':
     for i in range(2, 100):
         start = dt.now()
         a = Affine(i, 128)
-        a.start_generators(5)
-        a = a.retrieve()
+        a = a.generate()
         end = dt.now()
         print(i, end-start)
         
\ No newline at end of file
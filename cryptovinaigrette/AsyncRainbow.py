@@ -0,0 +1,164 @@
+'''
+asyncio facade over signing and verification.
+'''
+
+# -------------------- Imports -------------------- #
+import asyncio, functools, weakref
+from concurrent.futures import ThreadPoolExecutor
+from .cryptovinaigrette import *
+
+# -------------------- Module -------------------- #
+class AsyncRainbow:
+    def __init__(self, executor=None, workers=None, limit=8, timeout=None, window=0.002, max_batch=256, field=GF256np):
+        '''
+        Sign and verify from a running event loop without blocking it.
+
+        Parameters:
+            executor - `concurrent.futures` executor running file reads and field arithmetic;
+                       a thread pool of `workers` threads is created (and owned) when None
+            limit - Maximum number of jobs submitted to the executor at once; further calls wait
+            timeout - Default timeout in seconds of every call, None to wait forever
+            window - Seconds a verify call waits for other verify calls under the same key
+            max_batch - Pending verify calls under one key that trigger a batch immediately
+            field - Finite field backend used for signing
+
+        Concurrent `verify` calls under the same key are coalesced into one
+        `CompiledPublicKey.verify_batch`. Key objects are compiled once and kept for as long as
+        they are alive, so calls passing the same in-memory key batch together too. On timeout
+        or cancellation the awaiting coroutine is cancelled, but a job already running on the
+        executor finishes in the background and its result is dropped.
+
+        The instance may be created outside the event loop it is used from : the semaphore
+        enforcing `limit` is only created by the first call, inside the running loop.
+        '''
+        self.owned = executor is None
+        self.executor = ThreadPoolExecutor(max_workers=workers) if executor is None else executor
+        self.limit = limit
+        self.slots = None
+        self.timeout = timeout
+        self.window = window
+        self.max_batch = max_batch
+        self.field = field
+        self.pending = dict()
+        self.compiled = weakref.WeakKeyDictionary()
+
+    async def run(self, fn, *args):
+        '''
+        Run fn(*args) on the executor, waiting for a free slot first.
+        '''
+        # Created here : before Python 3.10 a Semaphore binds to the loop current at its creation
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.limit)
+        async with self.slots:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(fn, *args))
+
+    async def bounded(self, coroutine, timeout):
+        return await asyncio.wait_for(coroutine, self.timeout if timeout is None else timeout)
+
+    async def private_key(self, keyFile):
+        if isinstance(keyFile, (VinegarPool, PrivateKey)):
+            return keyFile
+        # Loading, converting or expanding a seed can take a while : off the loop
+        return await self.run(rainbowKeygen.private_key, keyFile)
+
+    async def public_key(self, keyFile):
+        if isinstance(keyFile, CompiledPublicKey):
+            return keyFile
+        if isinstance(keyFile, public_key_types):
+            pubKey = self.compiled.get(keyFile)
+            if pubKey is None:
+                # Expanding a compressed key can take a while : off the loop
+                pubKey = await self.run(rainbowKeygen.public_key, keyFile)
+                pubKey = self.compiled.setdefault(keyFile, pubKey)
+            return pubKey
+        return await self.run(rainbowKeygen.public_key, keyFile)
+
+    async def sign(self, keyFile, msgFile, timeout=None):
+        '''
+        Sign the message at msgFile (or bytes, or file object) with the private key at keyFile.
+        '''
+        async def sign():
+            privKey = await self.private_key(keyFile)
+            digest = await self.run(MessageDigest.digest, msgFile)
+            return await self.run(rainbowKeygen.sign_digest, privKey, digest, self.field)
+
+        return await self.bounded(sign(), timeout)
+
+    async def verify(self, keyFile, signature, msgFile, timeout=None):
+        '''
+        Verify the signature of the message at msgFile, batched with concurrent calls under the same key.
+        '''
+        async def verify():
+            pubKey = await self.public_key(keyFile)
+            # Checked here so that a malformed signature fails its own call, not the whole batch
+            x = GF256np.asfield(signature, "Signature")
+            if x.shape != (pubKey.n,):
+                raise ValueError("Signature has shape " + str(x.shape) + ", expected " + str((pubKey.n,)))
+            y = await self.run(rainbowKeygen.message_targets, pubKey.n, pubKey.v0, msgFile)
+
+            future = asyncio.get_running_loop().create_future()
+            batch = self.pending.setdefault(pubKey, list())
+            batch.append((x, y, future))
+            if len(batch) == 1:
+                asyncio.get_running_loop().call_later(self.window, self.flush, pubKey, batch)
+            elif len(batch) >= self.max_batch:
+                self.flush(pubKey, batch)
+            return await future
+
+        return await self.bounded(verify(), timeout)
+
+    def flush(self, pubKey, batch):
+        '''
+        Start verifying the pending calls of batch, unless it was already started.
+        '''
+        if self.pending.get(pubKey) is not batch:
+            return
+        del self.pending[pubKey]
+
+        # Calls that timed out or were cancelled while waiting are left out
+        batch = [entry for entry in batch if not entry[2].done()]
+        if batch:
+            asyncio.get_running_loop().create_task(self.verify_pending(pubKey, batch))
+
+    async def verify_pending(self, pubKey, batch):
+        Metrics.count('async.coalesced', len(batch))
+        try:
+            ok = await self.run(pubKey.verify_batch, [entry[0] for entry in batch], [entry[1] for entry in batch])
+        except Exception as e:
+            for signature, y, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (signature, y, future), result in zip(batch, ok):
+            if not future.done():
+                future.set_result(bool(result))
+
+    async def verify_batch(self, keyFile, signatures, msgFiles, timeout=None):
+        '''
+        Verify many (signature, message) pairs under one public key, as `rainbowKeygen.verify_batch`.
+        '''
+        async def verify_batch():
+            pubKey = await self.public_key(keyFile)
+            if len(signatures) != len(msgFiles):
+                raise ValueError("Need one message per signature! " + str(len(signatures)) + " vs " + str(len(msgFiles)))
+            targets = await asyncio.gather(*[self.run(rainbowKeygen.message_targets, pubKey.n, pubKey.v0, msgFile) for msgFile in msgFiles])
+            if not targets:
+                return np.zeros(0, dtype=bool)
+            return await self.run(pubKey.verify_batch, signatures, targets)
+
+        return await self.bounded(verify_batch(), timeout)
+
+    async def close(self):
+        '''
+        Shut down the executor if it was created here.
+        '''
+        if self.owned:
+            await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        return False
@@ -0,0 +1,236 @@
+'''
+The `cryptovinaigrette` command : keygen, sign, verify, sign-tree and verify-tree.
+
+Tree manifests are JSON documents :
+    {"format": "cryptovinaigrette-manifest", "version": 1, "n": n, "v0": v0, "digest": algorithm,
+     "files": {relative path: {"digest": hex, "signature": hex}}}
+'''
+
+# -------------------- Imports -------------------- #
+import argparse, json, os, sys, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from .cryptovinaigrette import *
+
+class CommandLineErrors(Exception): pass
+
+# Key of a sign-tree / verify-tree worker process, loaded once by `CommandLine.init_worker`
+worker_key = None
+
+# -------------------- Module -------------------- #
+class CommandLine:
+
+    manifest_format = 'cryptovinaigrette-manifest'
+    manifest_version = 1
+    manifest_name = 'cvmanifest.json'
+
+    def __init__(self):
+        pass
+
+    def walk(root, exclude=()):
+        '''
+        Sorted paths, relative to root and with '/' separators, of the regular files under root.
+        '''
+        exclude = set(os.path.abspath(path) for path in exclude)
+        ret = list()
+        for directory, dirs, files in os.walk(root):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                if os.path.isfile(path) and os.path.abspath(path) not in exclude:
+                    ret.append(os.path.relpath(path, root).replace(os.sep, '/'))
+        return ret
+
+    def hash_files(root, paths, threads):
+        '''
+        Digests of the files at paths, hashed on a pool of `threads` threads.
+        '''
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            return list(pool.map(lambda path: MessageDigest.digest(os.path.join(root, path)), paths))
+
+    def init_worker(keyFile, loader):
+        global worker_key
+        worker_key = key_cache.get(keyFile, loader)
+
+    def sign_chunk(digests):
+        return [bytes(int(i) for i in rainbowKeygen.sign_digest(worker_key, digest)) for digest in digests]
+
+    def verify_chunk(signatures, digests):
+        targets = rainbowKeygen.digest_targets_batch(worker_key.n, worker_key.v0, np.frombuffer(b''.join(digests), dtype=np.uint8).reshape(len(digests), -1))
+        return worker_key.verify_batch(np.frombuffer(b''.join(signatures), dtype=np.uint8).reshape(len(signatures), -1), targets).tolist()
+
+    def run_chunks(fn, keyFile, loader, columns, processes):
+        '''
+        Apply fn to consecutive chunks of the parallel lists in columns, on `processes` worker
+        processes that each load keyFile once. Returns the concatenated results.
+        '''
+        count = len(columns[0])
+        if not count:
+            return list()
+        size = max(1, -(-count // (4 * max(1, processes))))
+        chunks = [[column[start:start + size] for column in columns] for start in range(0, count, size)]
+
+        ret = list()
+        if processes <= 1:
+            CommandLine.init_worker(keyFile, loader)
+            for chunk in chunks:
+                ret.extend(fn(*chunk))
+            return ret
+
+        with ProcessPoolExecutor(max_workers=processes, initializer=CommandLine.init_worker, initargs=(keyFile, loader)) as pool:
+            for result in pool.map(fn, *zip(*chunks)):
+                ret.extend(result)
+        return ret
+
+    def report(action, count, size, timings):
+        '''
+        Print the throughput of a tree command : timings is a list of (phase, seconds).
+        '''
+        total = sum(seconds for phase, seconds in timings)
+        phases = ', '.join(
+            phase + ' %.2f s (%.1f files/s)' % (seconds, count / seconds if seconds else float('inf'))
+            for phase, seconds in timings
+        )
+        print('%s %d files (%.1f MB) in %.2f s : %s, %.1f MB/s overall' % (action, count, size / 1e6, total, phases, size / 1e6 / total if total else float('inf')), file=sys.stderr)
+
+    def keygen(options):
+        os.makedirs(options.out, exist_ok=True)
+        rainbowKeygen(
+            n=options.n, u=options.u, save=os.path.join(options.out, ''), params=options.params,
+            seed=True if options.seed else None, compressed=options.compressed, processes=options.processes,
+        )
+        print('Wrote', os.path.join(options.out, 'cvPriv.pem'), 'and', os.path.join(options.out, 'cvPub.pub'))
+        return 0
+
+    def sign(options):
+        signature = rainbowKeygen.sign(options.key, options.file)
+        out = options.out or options.file + '.sig'
+        rainbowKeygen.save_signature(signature, out)
+        print('Wrote', out)
+        return 0
+
+    def verify(options):
+        signature = rainbowKeygen.load_signature(options.signature or options.file + '.sig')
+        ok = rainbowKeygen.verify(options.key, signature, options.file)
+        print(options.file + ':', 'OK' if ok else 'FAILED')
+        return 0 if ok else 1
+
+    def sign_tree(options):
+        manifest = options.manifest or os.path.join(options.dir, CommandLine.manifest_name)
+        if not os.path.isdir(options.dir):
+            raise CommandLineErrors(options.dir + " is not a directory!")
+        # Loaded here first so that a bad key fails before any worker starts
+        key = rainbowKeygen.private_key(options.key)
+        paths = CommandLine.walk(options.dir, exclude=[manifest])
+        size = sum(os.path.getsize(os.path.join(options.dir, path)) for path in paths)
+
+        start = time.perf_counter()
+        digests = CommandLine.hash_files(options.dir, paths, options.threads)
+        hashed = time.perf_counter()
+        signatures = CommandLine.run_chunks(CommandLine.sign_chunk, options.key, rainbowKeygen.load_privatekey, [digests], options.processes)
+        signed = time.perf_counter()
+
+        document = {
+            'format': CommandLine.manifest_format,
+            'version': CommandLine.manifest_version,
+            'n': key.n,
+            'v0': key.v0,
+            'digest': MessageDigest.algorithm,
+            'files': {path: {'digest': digest.hex(), 'signature': signature.hex()} for path, digest, signature in zip(paths, digests, signatures)},
+        }
+        with open(manifest, 'w') as mFile:
+            json.dump(document, mFile, indent=1, sort_keys=True)
+
+        print('Wrote', manifest)
+        CommandLine.report('Signed', len(paths), size, [('hash', hashed - start), ('sign', signed - hashed)])
+        return 0
+
+    def verify_tree(options):
+        manifest = options.manifest or os.path.join(options.dir, CommandLine.manifest_name)
+        with open(manifest) as mFile:
+            document = json.load(mFile)
+        if document.get('format') != CommandLine.manifest_format or document.get('version') != CommandLine.manifest_version:
+            raise CommandLineErrors(manifest + " is not a version " + str(CommandLine.manifest_version) + " manifest!")
+        if document.get('digest') != MessageDigest.algorithm:
+            raise CommandLineErrors("Manifest digests use " + str(document.get('digest')) + ", not " + MessageDigest.algorithm + "!")
+
+        pubKey = rainbowKeygen.public_key(options.key)
+        if (pubKey.n, pubKey.v0) != (document['n'], document['v0']):
+            raise CommandLineErrors("Manifest was signed for n = " + str(document['n']) + ", v0 = " + str(document['v0']) + " but the key has n = " + str(pubKey.n) + ", v0 = " + str(pubKey.v0))
+
+        listed = document['files']
+        present = CommandLine.walk(options.dir, exclude=[manifest])
+        paths = [path for path in present if path in listed]
+        problems = {path: 'missing' for path in listed if not os.path.isfile(os.path.join(options.dir, path))}
+        problems.update({path: 'not in manifest' for path in present if path not in listed})
+        size = sum(os.path.getsize(os.path.join(options.dir, path)) for path in paths)
+
+        start = time.perf_counter()
+        digests = CommandLine.hash_files(options.dir, paths, options.threads)
+        hashed = time.perf_counter()
+        signatures = [bytes.fromhex(listed[path]['signature']) for path in paths]
+        for path, signature in zip(paths, signatures):
+            if len(signature) != pubKey.n:
+                raise CommandLineErrors("Signature of " + path + " has " + str(len(signature)) + " elements, expected " + str(pubKey.n))
+        ok = CommandLine.run_chunks(CommandLine.verify_chunk, options.key, rainbowKeygen.load_publickey, [signatures, digests], options.processes)
+        verified = time.perf_counter()
+
+        for path, digest, result in zip(paths, digests, ok):
+            if not result:
+                problems[path] = 'modified' if digest.hex() != listed[path]['digest'] else 'bad signature'
+
+        for path in sorted(problems):
+            print(path + ':', 'FAILED (' + problems[path] + ')')
+        print('%d of %d files OK' % (len(paths) - sum(path in problems for path in paths), len(set(listed) | set(present))))
+        CommandLine.report('Verified', len(paths), size, [('hash', hashed - start), ('verify', verified - hashed)])
+        return 1 if problems else 0
+
+    def parser():
+        parser = argparse.ArgumentParser(prog='cryptovinaigrette', description='Rainbow signatures over GF(256)')
+        parser.add_argument('-v', '--verbose', action='count', default=0, help='print progress (twice for more)')
+        commands = parser.add_subparsers(dest='command', metavar='command')
+        commands.required = True
+
+        keygen = commands.add_parser('keygen', help='generate cvPriv.pem and cvPub.pub')
+        keygen.add_argument('-o', '--out', default='.', help='destination folder (default: current folder)')
+        keygen.add_argument('--params', choices=sorted(presets), help='named parameter set, overrides -n and -u')
+        keygen.add_argument('-n', type=int, default=32, help='number of variables')
+        keygen.add_argument('-u', type=int, default=5, help='number of layers')
+        keygen.add_argument('--seed', action='store_true', help='save the private key as a 32 byte seed')
+        keygen.add_argument('--compressed', action='store_true', help='write a compressed public key')
+        keygen.add_argument('--processes', type=int, default=0, help='worker processes composing the public key')
+        keygen.set_defaults(run=CommandLine.keygen)
+
+        sign = commands.add_parser('sign', help='sign one file')
+        sign.add_argument('key', help='private key file')
+        sign.add_argument('file', help='file to sign')
+        sign.add_argument('-o', '--out', help='signature file (default: FILE.sig)')
+        sign.set_defaults(run=CommandLine.sign)
+
+        verify = commands.add_parser('verify', help='verify the signature of one file')
+        verify.add_argument('key', help='public key file')
+        verify.add_argument('file', help='signed file')
+        verify.add_argument('signature', nargs='?', help='signature file (default: FILE.sig)')
+        verify.set_defaults(run=CommandLine.verify)
+
+        for name, action, key, run in (('sign-tree', 'sign', 'private', CommandLine.sign_tree), ('verify-tree', 'verify', 'public', CommandLine.verify_tree)):
+            tree = commands.add_parser(name, help=action + ' every file under a directory against a manifest')
+            tree.add_argument('key', help=key + ' key file')
+            tree.add_argument('dir', help='directory to ' + action)
+            tree.add_argument('-m', '--manifest', help='manifest file (default: DIR/' + CommandLine.manifest_name + ')')
+            tree.add_argument('--threads', type=int, default=8, help='threads hashing files (default: 8)')
+            tree.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='worker processes to ' + action + ' with, 1 to stay in process (default: one per CPU)')
+            tree.set_defaults(run=run)
+
+        return parser
+
+def main(argv=None):
+    '''
+    Entry point of the `cryptovinaigrette` command, returning its exit status.
+    '''
+    options = CommandLine.parser().parse_args(argv)
+    args.v = options.verbose
+    try:
+        return options.run(options)
+    except (OSError, ValueError, CommandLineErrors, KeyFileErrors, SignatureFileErrors, ParameterErrors, GF256Errors) as e:
+        print('cryptovinaigrette:', e, file=sys.stderr)
+        return 2
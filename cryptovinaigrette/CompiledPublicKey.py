@@ -0,0 +1,140 @@
+'''
+Public key compiled into a dense coefficient matrix for fast evaluation.
+'''
+
+# -------------------- Imports -------------------- #
+import threading, numpy as np
+from .GF256np import *
+from .Keys import *
+
+# -------------------- Module -------------------- #
+class CompiledPublicKey(FrozenKey):
+    __slots__ = ('n', 'v0', 'k', 'm', 'coefficients', 'rows', 'cols', 'tables', 'lock')
+
+    def __init__(self, pubKey):
+        '''
+        Compile a public key (`PublicKey`, `CompressedPublicKey` or `pubKeyClass`) once for repeated evaluation.
+
+        The m public polynomials are stored as one read-only m x (n(n+1)/2 + n + 1) matrix whose
+        columns follow the monomial vector (x_i * x_j for i <= j, x_i, 1). The key object is not
+        modified, and a compiled key can be shared between threads.
+        '''
+        # Keys loaded from a binary key file already hold this layout, without a copy
+        pubKey = PublicKey.from_key(pubKey)
+        self.set('n', pubKey.n)
+        self.set('v0', pubKey.v0)
+        self.set('k', pubKey.k)
+        self.set('m', len(pubKey.coefficients))
+        self.set('coefficients', pubKey.coefficients)
+
+        # Index pairs (i, j), i <= j, in the same order as the compact quads
+        rows, cols = np.triu_indices(self.n)
+        rows.setflags(write=False)
+        cols.setflags(write=False)
+        self.set('rows', rows)
+        self.set('cols', cols)
+        self.set('tables', None)
+        self.set('lock', threading.Lock())
+
+    def __reduce__(self):
+        return (CompiledPublicKey, (PublicKey(self.n, (self.v0, self.n), self.k, self.coefficients),))
+
+    def monomials(self, signature):
+        '''
+        Expand a signature x into the monomial vector (x_i * x_j for i <= j, x_i, 1).
+        '''
+        x = GF256np.asfield(signature)
+        if len(x) != self.n:
+            raise GF256Errors("Signature must have " + str(self.n) + " elements, got " + str(len(x)))
+
+        return np.concatenate([GF256np.products[x[self.rows], x[self.cols]], x, np.ones(1, dtype=np.uint8)])
+
+    def batch_monomials(self, signatures):
+        '''
+        Expand a stack of signatures (one per row) into a matrix of monomial vectors.
+        '''
+        x = GF256np.asfield(signatures)
+        if x.ndim != 2 or x.shape[1] != self.n:
+            raise GF256Errors("Signatures must be a matrix with " + str(self.n) + " columns, got shape " + str(x.shape))
+
+        return np.concatenate([GF256np.products[x[:, self.rows], x[:, self.cols]], x, np.ones((len(x), 1), dtype=np.uint8)], axis=1)
+
+    def evaluate(self, signature, start=0, stop=None):
+        '''
+        Evaluate public polynomials `start` to `stop` at the signature.
+        '''
+        return GF256np.multiply_matrix_vector(self.coefficients[start:stop], self.monomials(signature))
+
+    def verify(self, signature, y):
+        '''
+        Check that the public polynomials map the signature to the targets y.
+
+        The first equation is checked on its own so that most invalid signatures are
+        rejected after a single row of the product.
+        '''
+        mono = self.monomials(signature)
+        y = GF256np.asfield(y)
+
+        for start, stop in ((0, 1), (1, self.m)):
+            ret = GF256np.multiply_matrix_vector(self.coefficients[start:stop], mono)
+            if not np.array_equal(ret, y[start:stop]):
+                return False
+
+        return True
+
+    def batch_tables(self):
+        '''
+        Per-monomial lookup tables used by `verify_batch`, built on first use.
+
+        Multiplication by a constant is linear over GF(2), so c * v = c * (v & 0x0f) + c * (v & 0xf0).
+        For every monomial column the products of its m coefficients with all 16 low and all
+        16 high nibbles are stored, padded to whole 64-bit words so that a row of m results can
+        be accumulated with a few wide XORs.
+        '''
+        with self.lock:
+            if self.tables is None:
+                words = (self.m + 7) // 8
+                nibbles = np.arange(16, dtype=np.uint8)
+                columns = self.coefficients.T[:, None, :]
+
+                tables = np.zeros((len(columns), 2, 16, words * 8), dtype=np.uint8)
+                tables[:, 0, :, :self.m] = GF256np.products[nibbles[None, :, None], columns]
+                tables[:, 1, :, :self.m] = GF256np.products[(nibbles << 4)[None, :, None], columns]
+                tables = tables.view(np.uint64).reshape(len(columns), 2, 16, words)
+                tables.setflags(write=False)
+                self.set('tables', tables)
+
+        return self.tables
+
+    def verify_batch(self, signatures, targets, chunk=4096):
+        '''
+        Verify many signatures at once.
+
+        Parameters:
+            signatures - B x n matrix (or list) of signatures
+            targets - B x m matrix (or list) of targets, one row per signature
+            chunk - number of signatures expanded into monomials at a time
+
+        Returns a boolean array of length B. Every public polynomial is evaluated for the whole
+        chunk in one pass over the monomial columns.
+        '''
+        signatures = GF256np.asfield(signatures)
+        targets = GF256np.asfield(targets)
+        if len(signatures) != len(targets):
+            raise GF256Errors("Need one target per signature! " + str(len(signatures)) + " vs " + str(len(targets)))
+
+        tables = self.batch_tables()
+        ret = np.zeros(len(signatures), dtype=bool)
+        for begin in range(0, len(signatures), chunk):
+            mono = self.batch_monomials(signatures[begin:begin + chunk]).T
+            low, high = mono & 0x0f, mono >> 4
+
+            values = np.zeros((mono.shape[1], tables.shape[-1]), dtype=np.uint64)
+            for j in range(len(mono)):
+                values ^= tables[j, 0][low[j]]
+                values ^= tables[j, 1][high[j]]
+
+            values = values.view(np.uint8)[:, :self.m]
+            ret[begin:begin + chunk] = (values == targets[begin:begin + chunk]).all(axis=1)
+
+        return ret
@@ -0,0 +1,125 @@
+'''
+Buffered cryptographic randomness for field elements.
+'''
+
+# -------------------- Imports -------------------- #
+import os, threading, numpy as np
+from .Formats import Formats
+
+# -------------------- Module -------------------- #
+class FieldRandom:
+
+    # Output of one SHAKE-256 call; fixed so that a seeded stream does not depend on `block`
+    xof_chunk = Formats.xof_chunk
+
+    def __init__(self, block=65536, source='urandom', seed=None):
+        '''
+        Source of uniformly random GF(256) elements drawn in bulk.
+
+        Parameters:
+            block - Number of random bytes fetched from the source at a time
+            source - 'urandom' to read os.urandom, 'shake' to expand a seed with SHAKE-256
+            seed - Seed of the 'shake' source, a fresh 32 byte seed from os.urandom when None
+
+        Bytes are served from an internal buffer so that a matrix of field elements costs one
+        system call per `block` bytes instead of one `secrets` call per element. The buffer is
+        discarded when the process id changes, so a forked child never replays bytes its parent
+        has already handed out. An unseeded 'shake' source is also reseeded in the child; an
+        explicitly seeded one is deterministic and keeps its stream.
+        '''
+        if source not in ('urandom', 'shake'):
+            raise ValueError("Unknown randomness source " + repr(source) + "!")
+
+        self.block = int(block)
+        self.source = source
+        self.seeded = seed is not None
+        self.seed = bytes(seed) if self.seeded else None
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        '''
+        Drop buffered bytes, and reseed an unseeded 'shake' source.
+        '''
+        self.pid = os.getpid()
+        self.buffer = b''
+        self.offset = 0
+        self.counter = 0
+        if self.source == 'shake' and not self.seeded:
+            self.seed = os.urandom(32)
+
+    def forked(self):
+        '''
+        Called in a freshly forked child : the lock may have been held by another parent thread.
+        '''
+        self.lock = threading.Lock()
+        self.reset()
+
+    def refill(self, count):
+        '''
+        Fetch at least count fresh bytes from the source.
+        '''
+        size = max(count, self.block)
+        if self.source == 'urandom':
+            return os.urandom(size)
+
+        # SHAKE-256 in counter mode : every chunk is XOF(seed || counter)
+        ret = list()
+        for i in range(-(-size // FieldRandom.xof_chunk)):
+            ret.append(Formats.xof_block(self.seed, self.counter))
+            self.counter += 1
+        return b''.join(ret)
+
+    def bytes(self, count):
+        '''
+        Return count random bytes.
+        '''
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()
+
+            if self.offset + count > len(self.buffer):
+                self.buffer = self.buffer[self.offset:] + self.refill(count)
+                self.offset = 0
+
+            ret = self.buffer[self.offset:self.offset + count]
+            self.offset += count
+            return ret
+
+    def elements(self, shape, nonzero=False):
+        '''
+        Uniformly random field elements as a uint8 array of the given shape.
+
+        With nonzero, elements are uniform over the 255 non zero elements. Zeros are rejected
+        in bulk, drawing only as many extra bytes as are expected to be missing.
+        '''
+        count = int(np.prod(shape))
+        ret = np.frombuffer(self.bytes(count), dtype=np.uint8)
+
+        if nonzero:
+            ret = ret[ret != 0]
+            while len(ret) < count:
+                missing = count - len(ret)
+                extra = np.frombuffer(self.bytes(missing + missing // 128 + 1), dtype=np.uint8)
+                ret = np.concatenate([ret, extra[extra != 0]])
+            ret = ret[:count]
+
+        return ret.copy().reshape(shape)
+
+    def element(self, nonzero=False):
+        '''
+        A single random field element as an int.
+        '''
+        return int(self.elements(1, nonzero)[0])
+
+    def permutation(self, m):
+        '''
+        Uniformly random permutation of range(m) as an int array.
+
+        Sorting by random 64 bit keys : ties, which would bias the order, have probability below m^2 / 2^65.
+        '''
+        return np.argsort(np.frombuffer(self.bytes(8 * m), dtype=np.uint64), kind='stable')
+
+# Shared by keygen, affine maps and signing
+field_random = FieldRandom()
+os.register_at_fork(after_in_child=field_random.forked)
@@ -0,0 +1,157 @@
+'''
+Binary layouts and index math shared by the numpy code and `Verifier`, on the standard library alone.
+
+Key files (`KeyFile`), signatures (`SignatureFile`), compressed public keys
+(`CompressedPublicKey`) and the digest to target mapping (`rainbowKeygen.digest_targets`) are
+all defined here once, so that `Verifier` cannot drift from them.
+'''
+
+# -------------------- Imports -------------------- #
+import hashlib, struct
+from .Parameters import RainbowParameters, ParameterErrors
+
+# -------------------- Module -------------------- #
+class Formats:
+
+    version = 1
+
+    # Key files : magic (4 bytes), version (u16), n (u16), k (u16), u (u16), then v (u16 each)
+    public_magic = b'CVPK'
+    compressed_magic = b'CVPC'
+    private_magic = b'CVSK'
+    seed_magic = b'CVSS'
+    key_magics = (public_magic, compressed_magic, private_magic, seed_magic)
+    key_header = struct.Struct('<4sHHHH')
+
+    # Signatures : magic (4 bytes), version (u16), n (u16), then n bytes
+    signature_magic = b'CVSG'
+    signature_header = struct.Struct('<4sHH')
+
+    # Seeds of seed private keys and compressed public keys
+    seed_size = 32
+    # Output of one SHAKE-256 call of a seeded stream
+    xof_chunk = 4096
+
+    def __init__(self):
+        pass
+
+    def pack_key_header(magic, n, k, v):
+        '''
+        Pack the header of a key file for a key with n variables and vinegar counts v.
+        '''
+        return Formats.key_header.pack(magic, Formats.version, n, k, len(v)) + struct.pack('<%dH' % len(v), *v)
+
+    def unpack_key_header(buf, error):
+        '''
+        Read the header of a key file, returning (magic, n, k, v, offset of the body).
+
+        Parameters:
+            buf - Bytes-like contents of the key file
+            error - Exception class raised when the header is malformed
+        '''
+        if len(buf) < Formats.key_header.size:
+            raise error("Key file is truncated!")
+        magic, version, n, k, u = Formats.key_header.unpack_from(buf, 0)
+        if magic not in Formats.key_magics:
+            raise error("Not a key file!")
+        if version != Formats.version:
+            raise error("Unsupported key file version " + str(version) + "!")
+
+        offset = Formats.key_header.size
+        if len(buf) < offset + 2 * u:
+            raise error("Key file is truncated!")
+        v = list(struct.unpack_from('<%dH' % u, buf, offset))
+        offset += 2 * u
+        try:
+            RainbowParameters.validate(v)
+        except ParameterErrors as e:
+            raise error("Corrupt key file header! " + str(e))
+        if v[-1] != n:
+            raise error("Corrupt key file header! n = " + str(n) + " v = " + str(v))
+
+        return magic, n, k, v, offset
+
+    def pack_signature_header(n):
+        return Formats.signature_header.pack(Formats.signature_magic, Formats.version, n)
+
+    def unpack_signature(data, error):
+        '''
+        The n signature bytes of an encoded signature, raising error when it is malformed.
+        '''
+        data = bytes(data)
+        if len(data) < Formats.signature_header.size:
+            raise error("Signature is truncated!")
+        magic, version, n = Formats.signature_header.unpack_from(data, 0)
+        if magic != Formats.signature_magic:
+            raise error("Not a signature!")
+        if version != Formats.version:
+            raise error("Unsupported signature version " + str(version) + "!")
+        if len(data) != Formats.signature_header.size + n:
+            raise error("Signature of n = " + str(n) + " has " + str(len(data) - Formats.signature_header.size) + " bytes!")
+        return data[Formats.signature_header.size:]
+
+    def public_width(n):
+        '''
+        Coefficients per public polynomial : x_j * x_k for j <= k, then x_j, then 1.
+        '''
+        return n * (n + 1) // 2 + n + 1
+
+    def xof_block(seed, counter):
+        '''
+        The block numbered counter of the SHAKE-256 counter mode stream of seed : XOF(seed || counter as u64).
+        '''
+        return hashlib.shake_256(seed + counter.to_bytes(8, 'little')).digest(Formats.xof_chunk)
+
+    def columns(n, vl):
+        '''
+        Columns of the public key rows (x_j * x_k for j <= k, x_j, 1) that hold monomials in
+        x_0 ... x_{vl - 1} only, in the order of the rows of a key with vl variables.
+        '''
+        quads = n * (n + 1) // 2
+        ret = [j * n - j * (j - 1) // 2 + k - j for j in range(vl) for k in range(j, vl)]
+        return ret + [quads + j for j in range(vl)] + [quads + n]
+
+    def regions(n, v):
+        '''
+        Seed-derived coefficients of a compressed public key as a list of (first row, sorted
+        columns), one per layer.
+
+        Layer l covers the monomials in x_0 ... x_{v[l] - 1} not covered by layer l - 1, on the
+        public rows from v[l] - v[0] on : those the keygen can still reach through the central
+        polynomials of layers l and above (see `rainbowKeygen.solve_public_seed`). Their values
+        are drawn region by region, row-major, from the SHAKE-256 stream of the public seed.
+        '''
+        ret = list()
+        previous = set()
+        for vl in v[:-1]:
+            columns = Formats.columns(n, vl)
+            ret.append((vl - v[0], sorted(set(columns) - previous)))
+            previous = set(columns)
+        return ret
+
+    def digest_targets(n, v0, digest):
+        '''
+        Map a message digest to the n - v0 targets, as bytes.
+
+        digest is the raw digest (bytes-like) or its hex string. The mapping is :
+            1. h = the lowercase hex string of the digest, of length 2 * len(digest)
+            2. h is cut into consecutive parts of len(h) // (n - v0 + 1) + 1 characters
+            3. target i is the bitwise OR of the ASCII codes of the characters of part i,
+               and targets without any character left are 0
+        '''
+        if isinstance(digest, str):
+            try:
+                digest = bytes.fromhex(digest)
+            except ValueError:
+                raise ValueError("Digest must be bytes or a hex string!")
+        message = bytes(digest).hex().encode()
+        if not message:
+            raise ValueError("Digest is empty!")
+
+        parts = n - v0
+        part = len(message) // (parts + 1) + 1
+        ret = bytearray(parts)
+        for i in range(parts):
+            for c in message[i * part:(i + 1) * part]:
+                ret[i] |= c
+        return bytes(ret)
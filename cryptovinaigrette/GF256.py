@@ -4,8 +4,8 @@ Galois Field 256 basic arithmetic operations
 
 # -------------------- IMPORTS and Definitions -------------------- #
 
-import secrets, argparse, numpy as np
-import dill, errno, os, subprocess as sp, atexit
+import numpy as np
+from .FieldRandom import *
 
 class GF256Errors(Exception): pass
 
@@ -62,9 +62,15 @@ class GF256:
         
     def get():
         ''' 
-        Returns a random element within this finite field!
+        Returns a random non zero element within this finite field!
         '''
-        return secrets.choice(GF256.exponenets)
+        return field_random.element(nonzero=True)
+
+    def fromarray(a):
+        '''
+        Convert a numpy array of field elements into this backend's representation (nested lists).
+        '''
+        return np.asarray(a).tolist()
     
     def add(x, y):
         '''
@@ -108,44 +114,6 @@ class GF256:
         else:
             return GF256.exponenets[255 - GF256.logarithms[x]]
 
-    def lower_zero_matrix(mat, inverse):
-        '''
-        Change elements below diagonal to 0.
-        '''
-        if inverse:
-            length = 2 * len(mat)
-        else:
-            length = len(mat) + 1
-
-        for k in range(len(mat)-1):
-            for i in range(k+1, len(mat)):
-                factor = mat[i][k]
-                factor2 = GF256.get_inverse(mat[k][k])
-                if factor2 == 0:
-                    raise GF256Errors("Matrix not invertible")
-                    print("sigh")
-                for j in range(k, length):
-                    temp = GF256.multiply(mat[k][j], factor2)
-                    temp = GF256.multiply(factor, temp)
-                    mat[i][j] = GF256.add(mat[i][j], temp)
-    
-    def upper_zero_matrix(mat):
-        '''
-        Change elements above diagonal to 0.
-        '''
-        temp = 0
-        for k in range(len(mat)-1, 0, -1):
-            for i in range(k-1, -1, -1):
-                factor = mat[i][k]
-                factor2 = GF256.get_inverse(mat[k][k])
-                if factor2 == 0:
-                    raise GF256Errors("Matrix not invertible")
-
-                for j in range(k, 2 * len(mat)):
-                    temp = GF256.multiply(mat[k][j], factor2)
-                    temp = GF256.multiply(factor, temp)
-                    mat[i][j] = GF256.add(mat[i][j], temp)
-
     def multiply_matrices(m1, m2):
         '''
         Multiply 2 matrices within the finite field.
@@ -247,91 +215,74 @@ class GF256:
 
         return ret
 
-    def substitute(m1, m2):
+    def row_reduce(mat, columns):
         '''
-        Backward substitution method to find x given m1 * x = m2
+        Gauss-Jordan elimination with row pivoting over the first `columns` columns of mat
+        (a list of rows, modified in place). Returns the rank of those columns.
         '''
-        temp = GF256.get_inverse(m1[len(m1) - 1][len(m1) - 1])
-        if temp == 0:
-            raise GF256Errors("Equations cannot be solved!")
-        
-        m2[len(m1) - 1] = GF256.multiply(m1[len(m1) - 1][len(m1)], temp)
-        
-        for i in range(len(m1) - 2, -1, -1):
-            _temp = m1[i][len(m1)]
-            
-            for j in range(len(m1) - 1, i, -1):
-                temp = GF256.multiply(m1[i][j], m2[j])
-                _temp = GF256.add(_temp, temp)
-            
-            temp = GF256.get_inverse(m1[i][i])
-            
-            if temp == 0:
-                raise GF256Errors("Equations cannot be solved!")
-            
-            m2[i] = GF256.multiply(_temp, temp)
-        
-        return m2
+        rank = 0
+        for col in range(columns):
+            pivot = rank
+            while pivot < len(mat) and mat[pivot][col] == 0:
+                pivot += 1
+            if pivot == len(mat):
+                continue
+
+            mat[rank], mat[pivot] = mat[pivot], mat[rank]
+            factor = GF256.inverses[mat[rank][col]]
+            mat[rank] = [GF256.multiply(e, factor) for e in mat[rank]]
+
+            for i in range(len(mat)):
+                factor = mat[i][col]
+                if i != rank and factor:
+                    mat[i] = [e ^ GF256.multiply(factor, p) for e, p in zip(mat[i], mat[rank])]
+
+            rank += 1
+            if rank == len(mat):
+                break
+
+        return rank
+
+    def rank(mat):
+        '''
+        Rank of a matrix within the finite field.
+        '''
+        return GF256.row_reduce([list(row) for row in mat], len(mat[0]))
 
     def solve_equation(m1, m2):
         '''
         Solve a system of linear equation of the form : m1 * x = m2
+
+        Only fails (with the rank in the message) if m1 is singular.
         '''
         if len(m1) != len(m2):
             raise GF256Errors("Matrices have to have same dimensions! " + str(len(m1)) + " vs " + str(len(m2)))
-        
-        temp = [[0] * (len(m1) + 1) for i in range(len(m1))]
-        ret = [0] * len(m1)
 
-        for i in range(len(m1)):
-            for j in range(len(m1[0])):
-                temp[i][j] = m1[i][j]
+        temp = [list(m1[i][:len(m1)]) + [m2[i]] for i in range(len(m1))]
 
-        for i in range(len(m2)):
-            temp[i][len(m2)] = GF256.add(m2[i], temp[i][len(m2)])
-        
-        GF256.lower_zero_matrix(temp, False)
-        ret = GF256.substitute(temp, ret)
+        rank = GF256.row_reduce(temp, len(m1))
+        if rank < len(m1):
+            raise GF256Errors("Equations cannot be solved! Rank " + str(rank) + " of " + str(len(m1)))
 
-        return ret
+        return [row[len(m1)] for row in temp]
 
     def find_inverse(mat):
         '''
         Calculate the inverse of a given matrix
         '''
-        try :
-            temp = [[0] * (2 * len(mat)) for i in range(len(mat))]
-            if len(mat) != len(mat[0]):
-                raise GF256Errors("Matrix is not invertible!" + str(len(mat) + " " + str(len(mat[0]))))
-            
-            for i in range(len(mat)):
-                for j in range(len(mat)):
-                    temp[i][j] = mat[i][j]
+        if len(mat) != len(mat[0]):
+            raise GF256Errors("Matrix is not invertible! " + str(len(mat)) + " " + str(len(mat[0])))
 
-                for j in range(len(mat), 2 * len(mat)):
-                    temp[i][j] = 0
+        n = len(mat)
+        temp = [list(mat[i]) + [0] * i + [1] + [0] * (n - i - 1) for i in range(n)]
 
-                temp[i][i + len(temp)] = 1
-        
-            GF256.lower_zero_matrix(temp, True)
-
-            for i in range(len(temp)):
-                factor = GF256.get_inverse(temp[i][i])
-                for j in range(i, len(temp) * 2):
-                    temp[i][j] = GF256.multiply(temp[i][j], factor)
-            
-            GF256.upper_zero_matrix(temp)
-            ret = [[0] * len(temp) for i in range(len(temp))]
-            for i in range(len(temp)):
-                for j in range(len(temp), 2 * len(temp)):
-                    ret[i][j - len(temp)] = temp[i][j]   
-
-            return ret
-
-        except GF256Errors as e:
-            raise GF256Errors("MATRIX NOT INVERTIBLE!")
-            return
+        rank = GF256.row_reduce(temp, n)
+        if rank < n:
+            raise GF256Errors("MATRIX NOT INVERTIBLE! Rank " + str(rank) + " of " + str(n))
+
+        return [row[n:] for row in temp]
 
+GF256.inverses = [GF256.get_inverse(x) for x in range(256)]
 
 
 if __name__ == '__main__':
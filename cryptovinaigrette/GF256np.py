@@ -0,0 +1,272 @@
+'''
+Galois Field 256 arithmetic operations on numpy uint8 arrays.
+
+Mirrors the interface of `GF256` so either class can be handed to `Affine`,
+`rainbowKeygen`, `rainbowKeygen.sign` and `rainbowKeygen.verify` as the field.
+Vectors and matrices are returned as uint8 ndarrays, scalars as ints.
+'''
+
+# -------------------- IMPORTS and Definitions -------------------- #
+
+import numpy as np
+from .GF256 import GF256, GF256Errors
+from .FieldRandom import field_random
+
+def _product_table():
+    '''
+    Build the 256 x 256 multiplication table from the exponent and log tables.
+    '''
+    exps = np.array(GF256.exponenets, dtype=np.uint8)
+    logs = np.array(GF256.logarithms, dtype=np.intp)
+    table = np.zeros((256, 256), dtype=np.uint8)
+    table[1:, 1:] = exps[(logs[1:, None] + logs[None, 1:]) % 255]
+    return table
+
+def _inverse_table():
+    '''
+    Build the table of multiplicative inverses (0 maps to 0, as in `GF256.get_inverse`).
+    '''
+    exps = np.array(GF256.exponenets, dtype=np.uint8)
+    logs = np.array(GF256.logarithms, dtype=np.intp)
+    table = np.zeros(256, dtype=np.uint8)
+    table[1:] = exps[255 - logs[1:]]
+    return table
+
+# -------------------- Module -------------------- #
+
+class GF256np:
+
+    mask = 0xff
+
+    products = _product_table()
+    inverses = _inverse_table()
+
+    def __init__(self):
+        pass
+
+    def asfield(x, name='Value'):
+        '''
+        Convert `x` to a uint8 array, checking that every element lies in the finite field.
+        '''
+        if isinstance(x, np.ndarray) and x.dtype == np.uint8:
+            return x
+        a = np.asarray(x)
+        if a.size and (a.min() < 0 or a.max() > 255):
+            raise GF256Errors(name + " Error : Values must be within finite field 256!")
+        return a.astype(np.uint8)
+
+    def isscalar(x, y):
+        '''
+        True when both operands are single field elements rather than arrays.
+        '''
+        return isinstance(x, (int, np.integer)) and isinstance(y, (int, np.integer))
+
+    def scalar(a):
+        '''
+        Return 0-d results as plain ints, leave arrays untouched.
+        '''
+        if isinstance(a, np.ndarray) and a.ndim == 0:
+            return int(a)
+        if isinstance(a, np.integer):
+            return int(a)
+        return a
+
+    def get():
+        '''
+        Returns a random element within this finite field!
+        '''
+        return field_random.element(nonzero=True)
+
+    def fromarray(a):
+        '''
+        Convert a numpy array of field elements into this backend's representation (uint8 arrays).
+        '''
+        return GF256np.asfield(a)
+
+    def add(x, y):
+        '''
+        Add two numbers (or arrays of equal shape) in the finite field
+        '''
+        if GF256np.isscalar(x, y):
+            return GF256.add(int(x), int(y))
+        x = GF256np.asfield(x, "Add")
+        y = GF256np.asfield(y, "Add")
+        return GF256np.scalar(x ^ y)
+
+    def subtract(x, y):
+        '''
+        Subtract two numbers (or arrays of equal shape) in the finite field
+        '''
+        if GF256np.isscalar(x, y):
+            return GF256.subtract(int(x), int(y))
+        x = GF256np.asfield(x, "Subtract")
+        y = GF256np.asfield(y, "Subtract")
+        return GF256np.scalar(x ^ y)
+
+    def multiply(x, y):
+        '''
+        Multiply two numbers (or arrays, elementwise) in the finite field
+        '''
+        if GF256np.isscalar(x, y):
+            return GF256.multiply(int(x), int(y))
+        x = GF256np.asfield(x, "Multiply")
+        y = GF256np.asfield(y, "Multiply")
+        return GF256np.scalar(GF256np.products[x, y])
+
+    def get_inverse(x):
+        '''
+        Find the inverse of a number (or of every element of an array) in the finite field
+        '''
+        x = GF256np.asfield(x, "Get Inverse")
+        return GF256np.scalar(GF256np.inverses[x])
+
+    def multiply_matrices(m1, m2):
+        '''
+        Multiply 2 matrices within the finite field.
+        '''
+        m1 = GF256np.asfield(m1, "Multiply")
+        m2 = GF256np.asfield(m2, "Multiply")
+        if m1.shape[1] != m2.shape[0]:
+            raise GF256Errors("Matrices have to have same dimensions.")
+
+        # Accumulate one rank-1 product per inner index to keep memory at O(rows * cols)
+        ret = np.zeros((m1.shape[0], m2.shape[1]), dtype=np.uint8)
+        for j in range(m1.shape[1]):
+            ret ^= GF256np.products[m1[:, j, None], m2[None, j, :]]
+
+        return ret
+
+    def multiply_matrix_vector(m, v):
+        '''
+        Multiply a matrix and a vector within the finite field.
+        '''
+        m = GF256np.asfield(m, "Multiply")
+        v = GF256np.asfield(v, "Multiply")
+        if m.shape[1] != len(v):
+            raise GF256Errors("Cannot multiply")
+
+        return np.bitwise_xor.reduce(GF256np.products[m, v[None, :]], axis=1)
+
+    def add_vectors(v1, v2):
+        '''
+        Add two vectors within the finite field.
+        '''
+        if len(v1) != len(v2):
+            raise GF256Errors("Vectors must be equal length! " + str(len(v1)) + " vs " + str(len(v2)))
+
+        return GF256np.asfield(v1, "Add") ^ GF256np.asfield(v2, "Add")
+
+    def multiply_scalar_vector(s, v):
+        '''
+        Multiply a scalar and a vector
+        '''
+        return GF256np.products[GF256np.asfield(s, "Multiply")][GF256np.asfield(v, "Multiply")]
+
+    def multiply_vectors(v1, v2):
+        '''
+        Multiply 2 vectors (outer product).
+        '''
+        if len(v1) != len(v2):
+            raise GF256Errors("Vectors must be of same length to multiply!")
+
+        v1 = GF256np.asfield(v1, "Multiply")
+        v2 = GF256np.asfield(v2, "Multiply")
+        return GF256np.products[v1[:, None], v2[None, :]]
+
+    def multiply_matrix_scalar(m, s):
+        '''
+        Multiply a matrix with a scalar (each element) within the finite field.
+        '''
+        return GF256np.products[GF256np.asfield(s, "Multiply")][GF256np.asfield(m, "Multiply")]
+
+    def add_matrices(m1, m2):
+        '''
+        Add two matrices given by m1 and m2
+        '''
+        m1 = GF256np.asfield(m1, "Add")
+        m2 = GF256np.asfield(m2, "Add")
+        if m1.shape != m2.shape:
+            raise GF256Errors("Matrices have to have same dimensions! " + str(len(m1)) + " vs " + str(len(m2)))
+
+        return m1 ^ m2
+
+    def row_reduce(mat, columns):
+        '''
+        Gauss-Jordan elimination with row pivoting over the first `columns` columns of mat
+        (a uint8 ndarray, modified in place). Returns the rank of those columns.
+        '''
+        rank = 0
+        for col in range(columns):
+            nonzero = np.flatnonzero(mat[rank:, col])
+            if not len(nonzero):
+                continue
+
+            pivot = rank + nonzero[0]
+            if pivot != rank:
+                mat[[rank, pivot]] = mat[[pivot, rank]]
+            mat[rank] = GF256np.products[GF256np.inverses[mat[rank, col]]][mat[rank]]
+
+            factors = mat[:, col].copy()
+            factors[rank] = 0
+            mat ^= GF256np.products[factors[:, None], mat[None, rank]]
+
+            rank += 1
+            if rank == len(mat):
+                break
+
+        return rank
+
+    def rank(mat):
+        '''
+        Rank of a matrix within the finite field.
+        '''
+        mat = GF256np.asfield(mat, "Rank").copy()
+        return GF256np.row_reduce(mat, mat.shape[1])
+
+    def solve_equation(m1, m2):
+        '''
+        Solve a system of linear equation of the form : m1 * x = m2
+
+        Only fails (with the rank in the message) if m1 is singular.
+        '''
+        if len(m1) != len(m2):
+            raise GF256Errors("Matrices have to have same dimensions! " + str(len(m1)) + " vs " + str(len(m2)))
+
+        m1 = GF256np.asfield(m1, "Solve")
+        n = len(m1)
+        temp = np.zeros((n, n + 1), dtype=np.uint8)
+        temp[:, :n] = m1[:, :n]
+        temp[:, n] = GF256np.asfield(m2, "Solve")
+
+        rank = GF256np.row_reduce(temp, n)
+        if rank < n:
+            raise GF256Errors("Equations cannot be solved! Rank " + str(rank) + " of " + str(n))
+
+        return temp[:, n].copy()
+
+    def find_inverse(mat):
+        '''
+        Calculate the inverse of a given matrix
+        '''
+        mat = GF256np.asfield(mat, "Find Inverse")
+        if mat.ndim != 2 or mat.shape[0] != mat.shape[1]:
+            raise GF256Errors("Matrix is not invertible! " + str(mat.shape))
+
+        n = len(mat)
+        temp = np.zeros((n, 2 * n), dtype=np.uint8)
+        temp[:, :n] = mat
+        temp[np.arange(n), np.arange(n) + n] = 1
+
+        rank = GF256np.row_reduce(temp, n)
+        if rank < n:
+            raise GF256Errors("MATRIX NOT INVERTIBLE! Rank " + str(rank) + " of " + str(n))
+
+        return temp[:, n:].copy()
+
+
+if __name__ == '__main__':
+    print("Mask value :", GF256np.mask)
+    print("Addition of 255 and 254 :", GF256np.add(255, 254))
+    print("Subtraction of 255 and 254 :", GF256np.subtract(255, 254))
+    print("Multiplication of 255 and 254 :", GF256np.multiply(255, 254))
+    print("Inverse of 1 is and 255 are :", GF256np.get_inverse(1), GF256np.get_inverse(255))
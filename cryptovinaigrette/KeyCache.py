@@ -0,0 +1,79 @@
+'''
+Process-wide cache of keys loaded from disk.
+'''
+
+# -------------------- Imports -------------------- #
+import os, threading
+from collections import OrderedDict
+
+# -------------------- Module -------------------- #
+class KeyCache:
+    def __init__(self, maxsize=32):
+        '''
+        Bounded LRU cache of parsed keys.
+
+        Parameters:
+            maxsize - Maximum number of cached entries, 0 disables caching
+
+        Entries are keyed by the resolved path and by the function used to build them from the
+        file, and are only reused while the file's (mtime, size, inode) is unchanged.
+        '''
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def stamp(path):
+        '''
+        Identity of the file currently at path.
+        '''
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def get(self, path, build):
+        '''
+        Return build(path), reusing the cached value while the file is unchanged.
+        '''
+        path = os.path.realpath(path)
+        stamp = KeyCache.stamp(path)
+
+        with self.lock:
+            entry = self.entries.get((path, build))
+            if entry is not None and entry[0] == stamp:
+                self.entries.move_to_end((path, build))
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = build(path)
+
+        if self.maxsize > 0:
+            with self.lock:
+                self.entries[(path, build)] = (stamp, value)
+                self.entries.move_to_end((path, build))
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+
+        return value
+
+    def invalidate(self, path):
+        '''
+        Drop every cached entry built from the file at path.
+        '''
+        path = os.path.realpath(path)
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == path]:
+                del self.entries[key]
+
+    def clear(self):
+        '''
+        Drop all cached entries and reset the hit and miss counters.
+        '''
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,212 @@
+'''
+Compact, versioned binary key files loaded through mmap.
+
+Layout (little endian):
+    magic (4 bytes)  - b'CVPK' for public keys, b'CVPC' for compressed public keys,
+                       b'CVSK' for private keys, b'CVSS' for seed private keys
+    version (u16), n (u16), k (u16), u (u16)
+    v[0] ... v[u-1] (u16 each) - number of vinegar variables per layer, v[u-1] == n
+
+Public key body:
+    m x (n(n+1)/2 + n + 1) uint8 matrix, one row per public polynomial holding
+    its upper triangular quadratic, linear and constant coefficients.
+
+Compressed public key body:
+    the 32 byte public seed, then the coefficients that are not derived from it, in
+    row-major order (see `CompressedPublicKey`).
+
+Private key body:
+    l1, l1inv (m x m), b1 (m), l2, l2inv (n x n), b2 (n), then for every layer
+    alphas (ol x vl x vl), betas (ol x ol x vl), gammas (ol x (vl + ol)) and etas (ol).
+
+Seed private key body:
+    the 32 byte seed the private key is expanded from (see `SeedKey`), then a flags byte :
+    bit 0 is set when the key belongs to a compressed public key.
+'''
+
+# -------------------- Imports -------------------- #
+import contextlib, mmap, os, tempfile, numpy as np
+from .Keys import *
+from .Formats import Formats
+
+class KeyFileErrors(Exception): pass
+
+# Mutable key classes of earlier versions, kept so that their dill pickles still load
+class pubKeyClass: pass
+class privKeyClass: pass
+
+# Objects accepted wherever a public or private key is, besides a path
+public_key_types = (PublicKey, CompressedPublicKey, pubKeyClass)
+private_key_types = (PrivateKey, SeedKey, privKeyClass)
+
+# -------------------- Module -------------------- #
+class KeyFile:
+
+    version = Formats.version
+    public_magic = Formats.public_magic
+    compressed_magic = Formats.compressed_magic
+    private_magic = Formats.private_magic
+    seed_magic = Formats.seed_magic
+    magics = Formats.key_magics
+    header = Formats.key_header
+
+    def __init__(self):
+        pass
+
+    def is_keyfile(path):
+        '''
+        Check whether the file at path is a binary key file (as opposed to a dill pickle).
+        '''
+        with open(path, 'rb') as kFile:
+            return kFile.read(4) in KeyFile.magics
+
+    def pack_header(magic, n, k, v):
+        '''
+        Pack the header for a key with n variables and vinegar counts v.
+        '''
+        return Formats.pack_key_header(magic, n, k, v)
+
+    def unpack_header(buf):
+        '''
+        Read the header of a key file, returning (magic, n, k, v, offset of the body).
+        '''
+        return Formats.unpack_key_header(buf, KeyFileErrors)
+
+    def public_layout(n, v):
+        '''
+        Shape of the public key coefficient matrix.
+        '''
+        return (n - v[0], Formats.public_width(n))
+
+    def private_layout(n, v):
+        '''
+        List of (name, shape) for the arrays of a private key, in file order.
+        '''
+        m = n - v[0]
+        ret = [('l1', (m, m)), ('l1inv', (m, m)), ('b1', (m,)), ('l2', (n, n)), ('l2inv', (n, n)), ('b2', (n,))]
+        for layer in range(len(v) - 1):
+            vl, ol = v[layer], v[layer + 1] - v[layer]
+            ret.append(('alphas', (ol, vl, vl)))
+            ret.append(('betas', (ol, ol, vl)))
+            ret.append(('gammas', (ol, vl + ol)))
+            ret.append(('etas', (ol,)))
+        return ret
+
+    @contextlib.contextmanager
+    def replacing(path, mode=0o644):
+        '''
+        Open a temporary file next to path for writing, and move it over path once written.
+
+        Keys loaded by `load` are views of the mapped file, so a key file is never rewritten in
+        place : the old inode stays intact for every mapping of it, in this process or another.
+        '''
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.')
+        try:
+            with os.fdopen(fd, 'wb') as kFile:
+                yield kFile
+            os.chmod(temp, mode)
+            os.replace(temp, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temp)
+            raise
+
+    def save_publickey(pubKey, path):
+        '''
+        Write a public key to path in the binary format.
+        '''
+        n = int(pubKey.n)
+        v = [int(i) for i in getattr(pubKey, 'v', [pubKey.v0, n])]
+        m = len(pubKey.quads)
+        coefficients = np.concatenate([
+            np.asarray(pubKey.quads, dtype=np.uint8).reshape(m, -1),
+            np.asarray(pubKey.linear, dtype=np.uint8).reshape(m, n),
+            np.asarray(pubKey.consts, dtype=np.uint8).reshape(m, 1),
+        ], axis=1)
+
+        with KeyFile.replacing(path) as kFile:
+            kFile.write(KeyFile.pack_header(KeyFile.public_magic, n, int(pubKey.k), v))
+            kFile.write(coefficients.tobytes())
+
+    def save_compressed(pubKey, path):
+        '''
+        Write a `CompressedPublicKey` to path in the binary format.
+        '''
+        with KeyFile.replacing(path) as kFile:
+            kFile.write(KeyFile.pack_header(KeyFile.compressed_magic, pubKey.n, pubKey.k, pubKey.v))
+            kFile.write(pubKey.seed)
+            kFile.write(np.asarray(pubKey.stored, dtype=np.uint8).tobytes())
+
+    def save_privatekey(privKey, path):
+        '''
+        Write a private key to path in the binary format.
+        '''
+        F_layers = privKey.F_layers
+        n = len(F_layers[-1][0]['alphas'][0]) + len(F_layers[-1][0]['betas'])
+        v = [len(layer[0]['alphas'][0]) for layer in F_layers] + [n]
+
+        with KeyFile.replacing(path, 0o600) as kFile:
+            kFile.write(KeyFile.pack_header(KeyFile.private_magic, n, int(privKey.k), v))
+            for name in ('l1', 'l1inv', 'b1', 'l2', 'l2inv', 'b2'):
+                kFile.write(np.asarray(getattr(privKey, name), dtype=np.uint8).tobytes())
+            for layer in F_layers:
+                for name in ('alphas', 'betas', 'gammas', 'etas'):
+                    kFile.write(np.asarray([poly[name] for poly in layer], dtype=np.uint8).tobytes())
+
+    def save_seedkey(seedKey, path):
+        '''
+        Write a seed private key to path in the binary format.
+        '''
+        with KeyFile.replacing(path, 0o600) as kFile:
+            kFile.write(KeyFile.pack_header(KeyFile.seed_magic, seedKey.n, seedKey.k, seedKey.v))
+            kFile.write(seedKey.seed)
+            kFile.write(bytes([int(seedKey.compressed)]))
+
+    def map(path):
+        '''
+        Map a key file read-only into memory.
+        '''
+        with open(path, 'rb') as kFile:
+            try:
+                return mmap.mmap(kFile.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise KeyFileErrors("Key file is empty!")
+
+    def load(path):
+        '''
+        Load a key file as a `PublicKey`, `CompressedPublicKey`, `PrivateKey` or `SeedKey`.
+
+        The key's arrays are read-only, zero-copy views of the mapped file.
+        '''
+        buf = KeyFile.map(path)
+        magic, n, k, v, offset = KeyFile.unpack_header(buf)
+
+        def take(shape):
+            nonlocal offset
+            count = int(np.prod(shape))
+            if offset + count > len(buf):
+                raise KeyFileErrors("Key file is truncated!")
+            ret = np.frombuffer(buf, dtype=np.uint8, count=count, offset=offset).reshape(shape)
+            offset += count
+            return ret
+
+        if magic == KeyFile.public_magic:
+            key = PublicKey(n, v, k, take(KeyFile.public_layout(n, v)))
+        elif magic == KeyFile.compressed_magic:
+            seed = take((Formats.seed_size,)).tobytes()
+            key = CompressedPublicKey(n, v, k, seed, take((len(buf) - offset,)))
+        elif magic == KeyFile.seed_magic:
+            seed = take((Formats.seed_size,)).tobytes()
+            flags = take((1,))[0]
+            key = SeedKey(seed, v, k, compressed=bool(flags & 1))
+        else:
+            layout = KeyFile.private_layout(n, v)
+            maps = [take(shape) for name, shape in layout[:6]]
+            arrays = [tuple(take(shape) for name, shape in layout[6 + 4 * layer:10 + 4 * layer]) for layer in range(len(v) - 1)]
+            key = PrivateKey(k, *maps, arrays)
+
+        if offset != len(buf):
+            raise KeyFileErrors("Key file has " + str(len(buf) - offset) + " trailing bytes!")
+
+        return key
@@ -0,0 +1,271 @@
+'''
+Immutable public and private key types, safe to share between threads.
+'''
+
+# -------------------- Imports -------------------- #
+import threading, numpy as np
+from types import MappingProxyType
+from .FieldRandom import FieldRandom
+from .Formats import Formats
+
+# -------------------- Module -------------------- #
+def readonly(a, shape=None):
+    '''
+    uint8 array of a that cannot be written to. Read-only arrays (e.g. views of a mapped key file) are not copied.
+    '''
+    ret = np.asarray(a, dtype=np.uint8)
+    if shape is not None:
+        ret = ret.reshape(shape)
+    if ret.flags.writeable:
+        ret = ret.copy()
+        ret.setflags(write=False)
+    return ret
+
+class FrozenKey:
+    '''
+    Base of the key types : attributes are set once in __init__ and never again.
+    '''
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(type(self).__name__ + " is immutable!")
+
+    def __delattr__(self, name):
+        raise AttributeError(type(self).__name__ + " is immutable!")
+
+    def set(self, name, value):
+        object.__setattr__(self, name, value)
+
+class PublicKey(FrozenKey):
+    __slots__ = ('n', 'v0', 'v', 'k', 'coefficients', 'quads', 'linear', 'consts', '__weakref__')
+
+    def __init__(self, n, v, k, coefficients):
+        '''
+        Public key holding the m x (n(n+1)/2 + n + 1) coefficient matrix of the public polynomials.
+
+        quads, linear and consts are read-only views of its columns.
+        '''
+        n = int(n)
+        quads = n * (n + 1) // 2
+        coefficients = readonly(coefficients)
+        if coefficients.ndim != 2 or coefficients.shape[1] != quads + n + 1:
+            raise ValueError("Coefficient matrix of shape " + str(coefficients.shape) + " does not match n = " + str(n))
+
+        self.set('n', n)
+        self.set('v', tuple(int(i) for i in v))
+        self.set('v0', self.v[0])
+        self.set('k', int(k))
+        self.set('coefficients', coefficients)
+        self.set('quads', coefficients[:, :quads])
+        self.set('linear', coefficients[:, quads:quads + n])
+        self.set('consts', coefficients[:, -1])
+
+    def from_key(pubKey):
+        '''
+        Frozen copy of any public key object (e.g. a `pubKeyClass` loaded from a dill pickle).
+        '''
+        if isinstance(pubKey, PublicKey):
+            return pubKey
+        if isinstance(pubKey, CompressedPublicKey):
+            return pubKey.expand()
+
+        n = int(pubKey.n)
+        m = len(pubKey.quads)
+        coefficients = getattr(pubKey, 'coefficients', None)
+        if coefficients is None:
+            coefficients = np.concatenate([
+                np.asarray(pubKey.quads, dtype=np.uint8).reshape(m, -1),
+                np.asarray(pubKey.linear, dtype=np.uint8).reshape(m, n),
+                np.asarray(pubKey.consts, dtype=np.uint8).reshape(m, 1),
+            ], axis=1)
+        return PublicKey(n, getattr(pubKey, 'v', (pubKey.v0, n)), pubKey.k, coefficients)
+
+    def __reduce__(self):
+        return (PublicKey, (self.n, self.v, self.k, np.asarray(self.coefficients)))
+
+class PrivateKey(FrozenKey):
+    __slots__ = ('n', 'v0', 'v', 'k', 'layers', 'l1', 'l1inv', 'b1', 'l2', 'l2inv', 'b2', 'arrays', 'F_layers')
+
+    def __init__(self, k, l1, l1inv, b1, l2, l2inv, b2, arrays):
+        '''
+        Private key : the affine maps L1, L2 with their inverses and the central map F.
+
+        arrays holds one (alphas, betas, gammas, etas) tuple per layer, stacked over the layer's
+        ol polynomials with shapes (ol, vl, vl), (ol, ol, vl), (ol, vl + ol) and (ol,).
+        F_layers exposes the same coefficients per polynomial, as read-only mappings of views,
+        in the layout `rainbowKeygen.layer_system` expects.
+        '''
+        arrays = tuple(tuple(readonly(a) for a in layer) for layer in arrays)
+        if not arrays:
+            raise ValueError("Private key needs at least one layer!")
+
+        v = [len(alphas[0]) for alphas, betas, gammas, etas in arrays]
+        v.append(v[-1] + len(arrays[-1][1]))
+        m = v[-1] - v[0]
+
+        self.set('n', v[-1])
+        self.set('v', tuple(v))
+        self.set('v0', v[0])
+        self.set('k', int(k))
+        self.set('layers', len(arrays))
+        self.set('l1', readonly(l1, (m, m)))
+        self.set('l1inv', readonly(l1inv, (m, m)))
+        self.set('b1', readonly(b1, (m,)))
+        self.set('l2', readonly(l2, (self.n, self.n)))
+        self.set('l2inv', readonly(l2inv, (self.n, self.n)))
+        self.set('b2', readonly(b2, (self.n,)))
+        self.set('arrays', arrays)
+        self.set('F_layers', tuple(
+            tuple(
+                MappingProxyType({'alphas': alphas[i], 'betas': betas[i], 'gammas': gammas[i:i+1], 'etas': etas[i:i+1]})
+                for i in range(len(etas))
+            )
+            for alphas, betas, gammas, etas in arrays
+        ))
+
+    def from_key(privKey):
+        '''
+        Frozen copy of any private key object (e.g. a `privKeyClass` loaded from a dill pickle).
+        '''
+        if isinstance(privKey, PrivateKey):
+            return privKey
+        if isinstance(privKey, SeedKey):
+            return privKey.expand()
+
+        arrays = list()
+        for layer in privKey.F_layers:
+            vl = len(layer[0]['alphas'][0])
+            ol = len(layer[0]['betas'])
+            arrays.append((
+                np.asarray([poly['alphas'] for poly in layer], dtype=np.uint8).reshape(ol, vl, vl),
+                np.asarray([poly['betas'] for poly in layer], dtype=np.uint8).reshape(ol, ol, vl),
+                np.asarray([poly['gammas'] for poly in layer], dtype=np.uint8).reshape(ol, vl + ol),
+                np.asarray([poly['etas'] for poly in layer], dtype=np.uint8).reshape(ol),
+            ))
+        return PrivateKey(privKey.k, privKey.l1, privKey.l1inv, privKey.b1, privKey.l2, privKey.l2inv, privKey.b2, arrays)
+
+    def __reduce__(self):
+        return (PrivateKey, (self.k, self.l1, self.l1inv, self.b1, self.l2, self.l2inv, self.b2, self.arrays))
+
+class CompressedPublicKey(FrozenKey):
+    __slots__ = ('n', 'v0', 'v', 'k', 'seed', 'stored', 'expanded', 'lock', '__weakref__')
+
+    def __init__(self, n, v, k, seed, stored, expanded=None):
+        '''
+        Public key whose coefficients are partly derived from a 32 byte public seed.
+
+        The coefficients at the positions of `regions` are expanded from the seed with SHAKE-256,
+        stored holds all the others in row-major order. The dense `PublicKey` is rebuilt on the
+        first call to `expand` and kept in memory afterwards.
+        '''
+        n = int(n)
+        seed = bytes(seed)
+        if len(seed) != Formats.seed_size:
+            raise ValueError("Seed must be " + str(Formats.seed_size) + " bytes, got " + str(len(seed)))
+        v = tuple(int(i) for i in v)
+        stored = readonly(stored)
+        count = int((~CompressedPublicKey.mask(n, v)).sum())
+        if stored.shape != (count,):
+            raise ValueError("Compressed key of n = " + str(n) + " needs " + str(count) + " stored coefficients, got " + str(stored.shape))
+
+        self.set('n', n)
+        self.set('v', v)
+        self.set('v0', v[0])
+        self.set('k', int(k))
+        self.set('seed', seed)
+        self.set('stored', stored)
+        self.set('expanded', expanded)
+        self.set('lock', threading.Lock())
+
+    def columns(n, vl):
+        '''
+        `Formats.columns` as an index array.
+        '''
+        return np.array(Formats.columns(n, vl), dtype=np.int64)
+
+    def regions(n, v):
+        '''
+        `Formats.regions`, with the columns of every region as an index array.
+        '''
+        return [(start, np.array(columns, dtype=np.int64)) for start, columns in Formats.regions(n, v)]
+
+    def mask(n, v):
+        '''
+        Boolean m x (n(n+1)/2 + n + 1) matrix, True at the seed-derived coefficients.
+        '''
+        ret = np.zeros((n - v[0], Formats.public_width(n)), dtype=bool)
+        for start, columns in CompressedPublicKey.regions(n, v):
+            ret[start:, columns] = True
+        return ret
+
+    def seed_blocks(seed, n, v):
+        '''
+        Values of the seed-derived coefficients, one (rows, columns) block per entry of `regions`.
+        '''
+        rng = FieldRandom(source='shake', seed=seed)
+        return [rng.elements((n - v[0] - start, len(columns))) for start, columns in CompressedPublicKey.regions(n, v)]
+
+    def compress(pubKey, seed):
+        '''
+        Compressed form of a public key generated for the public seed, see `rainbowKeygen(compressed=True)`.
+        '''
+        pubKey = PublicKey.from_key(pubKey)
+        for (start, columns), block in zip(CompressedPublicKey.regions(pubKey.n, pubKey.v), CompressedPublicKey.seed_blocks(seed, pubKey.n, pubKey.v)):
+            if not np.array_equal(pubKey.coefficients[start:, columns], block):
+                raise ValueError("Public key was not generated for this seed!")
+        stored = pubKey.coefficients[~CompressedPublicKey.mask(pubKey.n, pubKey.v)]
+        return CompressedPublicKey(pubKey.n, pubKey.v, pubKey.k, seed, stored, pubKey)
+
+    def expand(self):
+        '''
+        The dense `PublicKey`, rebuilt once.
+        '''
+        with self.lock:
+            if self.expanded is None:
+                coefficients = np.zeros((self.n - self.v0, self.n * (self.n + 1) // 2 + self.n + 1), dtype=np.uint8)
+                coefficients[~CompressedPublicKey.mask(self.n, self.v)] = self.stored
+                for (start, columns), block in zip(CompressedPublicKey.regions(self.n, self.v), CompressedPublicKey.seed_blocks(self.seed, self.n, self.v)):
+                    coefficients[start:, columns] = block
+                self.set('expanded', PublicKey(self.n, self.v, self.k, coefficients))
+        return self.expanded
+
+    def __reduce__(self):
+        return (CompressedPublicKey, (self.n, self.v, self.k, self.seed, np.asarray(self.stored)))
+
+class SeedKey(FrozenKey):
+    __slots__ = ('n', 'v0', 'v', 'k', 'seed', 'compressed', 'expanded', 'lock')
+
+    def __init__(self, seed, v, k, expanded=None, compressed=False):
+        '''
+        Private key stored as the 32 byte seed it was generated from, for the layer sizes v.
+
+        compressed tells whether the key was generated for a `CompressedPublicKey`, whose
+        public seed is derived from the same seed. The `PrivateKey` is rebuilt from the seed on
+        the first call to `expand` and kept in memory afterwards. expanded may pass it in when
+        it is already known (e.g. right after keygen).
+        '''
+        seed = bytes(seed)
+        if len(seed) != 32:
+            raise ValueError("Seed must be 32 bytes, got " + str(len(seed)))
+
+        self.set('v', tuple(int(i) for i in v))
+        self.set('n', self.v[-1])
+        self.set('v0', self.v[0])
+        self.set('k', int(k))
+        self.set('seed', seed)
+        self.set('compressed', bool(compressed))
+        self.set('expanded', expanded)
+        self.set('lock', threading.Lock())
+
+    def expand(self):
+        '''
+        The expanded `PrivateKey`, derived from the seed once.
+        '''
+        with self.lock:
+            if self.expanded is None:
+                from .cryptovinaigrette import rainbowKeygen
+                self.set('expanded', rainbowKeygen.expand_seed(self.seed, self.v, self.k, self.compressed))
+        return self.expanded
+
+    def __reduce__(self):
+        return (SeedKey, (self.seed, self.v, self.k, None, self.compressed))
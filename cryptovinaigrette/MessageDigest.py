@@ -0,0 +1,95 @@
+'''
+Incremental hashing of messages of any size.
+'''
+
+# -------------------- Imports -------------------- #
+import hashlib, io, mmap, os
+
+# -------------------- Module -------------------- #
+class MessageDigest:
+
+    algorithm = 'ripemd160'
+    chunk_size = 1 << 20            # Bytes hashed per update when streaming
+    mmap_threshold = 64 << 20       # Files at least this large are mapped instead of read
+
+    def __init__(self):
+        pass
+
+    def new():
+        return hashlib.new(MessageDigest.algorithm)
+
+    def update_buffer(h, data):
+        '''
+        Hash a bytes-like object in chunk_size slices, without copying it.
+        '''
+        view = memoryview(data).cast('B')
+        for start in range(0, len(view), MessageDigest.chunk_size):
+            h.update(view[start:start + MessageDigest.chunk_size])
+
+    def update_stream(h, stream):
+        '''
+        Hash an open file object from its current position to its end.
+
+        Binary streams are read into one reused buffer, text streams are encoded to UTF-8 chunk
+        by chunk, so memory use does not depend on the size of the file.
+        '''
+        if isinstance(stream, io.TextIOBase):
+            for chunk in iter(lambda: stream.read(MessageDigest.chunk_size), ''):
+                h.update(chunk.encode('utf-8'))
+        elif hasattr(stream, 'readinto'):
+            buf = bytearray(MessageDigest.chunk_size)
+            view = memoryview(buf)
+            while True:
+                count = stream.readinto(buf)
+                if not count:
+                    break
+                h.update(view[:count])
+        else:
+            for chunk in iter(lambda: stream.read(MessageDigest.chunk_size), b''):
+                h.update(chunk)
+
+    def update_path(h, path, use_mmap=None):
+        '''
+        Hash the file at path, read in binary mode.
+
+        With use_mmap None, files of at least mmap_threshold bytes are memory-mapped and hashed
+        in place; True or False forces the choice (empty files are always read).
+        '''
+        with open(path, 'rb') as mFile:
+            size = os.fstat(mFile.fileno()).st_size
+            if use_mmap is None:
+                use_mmap = size >= MessageDigest.mmap_threshold
+            if use_mmap and size:
+                with mmap.mmap(mFile.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    MessageDigest.update_buffer(h, buf)
+            else:
+                MessageDigest.update_stream(h, mFile)
+
+    def digest(message, use_mmap=None):
+        '''
+        Digest of a message given as a path (str or os.PathLike), bytes-like object or open file object.
+        '''
+        h = MessageDigest.new()
+        if isinstance(message, (str, os.PathLike)):
+            MessageDigest.update_path(h, message, use_mmap)
+        elif isinstance(message, (bytes, bytearray, memoryview, mmap.mmap)):
+            MessageDigest.update_buffer(h, message)
+        elif hasattr(message, 'read'):
+            MessageDigest.update_stream(h, message)
+        else:
+            raise TypeError("Cannot hash a message of type " + type(message).__name__ + "!")
+        return h.digest()
+
+    def hexdigest(message, use_mmap=None):
+        '''
+        Hex string of `digest`.
+        '''
+        return MessageDigest.digest(message, use_mmap).hex()
+
+    def hexdigest_text(message):
+        '''
+        Hex digest of in-memory text, hashed as its UTF-8 encoding.
+        '''
+        h = MessageDigest.new()
+        h.update(message.encode('utf-8'))
+        return h.hexdigest()
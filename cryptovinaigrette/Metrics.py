@@ -0,0 +1,140 @@
+'''
+Instrumentation hooks for keygen, signing and verification.
+'''
+
+# -------------------- Imports -------------------- #
+import threading, time
+
+# -------------------- Module -------------------- #
+class NullTimer:
+    '''
+    Timer handed out while no sink is registered : does nothing.
+    '''
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class Timer:
+    def __init__(self, name, tags):
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        Metrics.emit('timing', self.name, time.perf_counter() - self.start, self.tags)
+        return False
+
+class Metrics:
+    '''
+    Registry of metrics sinks.
+
+    A sink is any callable sink(kind, name, value, tags) where kind is 'timing' (value in
+    seconds), 'count' or 'gauge' (a level, e.g. bytes), name is a dotted event name such as 'sign.layer' and tags is a dict
+    (e.g. {'layer': 1}). When no sink is registered every hook returns immediately.
+
+    Events:
+        keygen.vinegars, keygen.coefficients, keygen.affine_l1, keygen.affine_l2,
+        keygen.polynomial (tag layer), keygen.composition, keygen.compaction,
+        keygen.save_publickey, keygen.save_privatekey, keygen.total,
+        keygen.buffer_bytes (gauge, buffers allocated by the public key composition)
+        keygen.expand_seed, keygen.public_seed
+        sign.hash, sign.key_load, sign.targets, sign.layer (tag layer), sign.total,
+        sign.restart (count, tags layer and reason), sign.restarts (count per call)
+        verify.hash, verify.key_load, verify.targets, verify.evaluate, verify.total
+        verify_batch.key_load, verify_batch.targets, verify_batch.evaluate (tag size)
+        pool.generate, pool.singular (count), pool.miss (count)
+        async.coalesced (count of verify calls checked in one batch)
+        daemon.batch (count of requests handled in one batch)
+        store.verify (tag size)
+    '''
+
+    sinks = list()
+    lock = threading.Lock()
+    null = NullTimer()
+
+    def register(sink):
+        '''
+        Start sending events to sink.
+        '''
+        with Metrics.lock:
+            Metrics.sinks = Metrics.sinks + [sink]
+        return sink
+
+    def unregister(sink):
+        '''
+        Stop sending events to sink.
+        '''
+        with Metrics.lock:
+            Metrics.sinks = [s for s in Metrics.sinks if s is not sink]
+
+    def emit(kind, name, value, tags):
+        for sink in Metrics.sinks:
+            sink(kind, name, value, tags)
+
+    def timer(name, **tags):
+        '''
+        Context manager timing its body as event `name`.
+        '''
+        if not Metrics.sinks:
+            return Metrics.null
+        return Timer(name, tags)
+
+    def count(name, value=1, **tags):
+        '''
+        Report a counter event.
+        '''
+        if Metrics.sinks:
+            Metrics.emit('count', name, value, tags)
+
+    def gauge(name, value, **tags):
+        '''
+        Report the current level of a quantity.
+        '''
+        if Metrics.sinks:
+            Metrics.emit('gauge', name, value, tags)
+
+class Recorder:
+    def __init__(self):
+        '''
+        Sink keeping every event in memory, for tests and benchmarks.
+
+        Use as a context manager to register it for the duration of a block.
+        '''
+        self.events = list()
+        self.lock = threading.Lock()
+
+    def __call__(self, kind, name, value, tags):
+        with self.lock:
+            self.events.append((kind, name, value, tags))
+
+    def total(self, name):
+        '''
+        Sum of the values of every event called name.
+        '''
+        return sum(value for kind, n, value, tags in self.events if n == name)
+
+    def totals(self, prefix=''):
+        '''
+        {name : summed value} for every event whose name starts with prefix.
+        '''
+        ret = dict()
+        for kind, name, value, tags in self.events:
+            if name.startswith(prefix):
+                ret[name] = ret.get(name, 0) + value
+        return ret
+
+    def clear(self):
+        with self.lock:
+            self.events = list()
+
+    def __enter__(self):
+        return Metrics.register(self)
+
+    def __exit__(self, *exc):
+        Metrics.unregister(self)
+        return False
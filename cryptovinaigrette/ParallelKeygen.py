@@ -0,0 +1,149 @@
+'''
+Multi-core composition of the public key with operands in shared memory.
+'''
+
+# -------------------- Imports -------------------- #
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from .GF256np import *
+
+# -------------------- Module -------------------- #
+class SharedArrays:
+    def __init__(self, shapes):
+        '''
+        uint8 arrays in named shared memory blocks, one per entry of shapes {name : shape}.
+
+        `spec` describes the blocks to worker processes, which map them with `attach`
+        instead of receiving pickled copies.
+        '''
+        self.blocks = dict()
+        self.arrays = dict()
+        self.spec = dict()
+        try:
+            for name, shape in shapes.items():
+                block = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape))))
+                self.blocks[name] = block
+                self.arrays[name] = np.ndarray(shape, dtype=np.uint8, buffer=block.buf)
+                self.arrays[name][...] = 0
+                self.spec[name] = (block.name, shape)
+        except BaseException:
+            self.close()
+            raise
+
+    def attach(spec):
+        '''
+        Map the blocks of a spec, returning (blocks, arrays).
+        '''
+        blocks, arrays = list(), dict()
+        for name, (block, shape) in spec.items():
+            blocks.append(shared_memory.SharedMemory(name=block))
+            arrays[name] = np.ndarray(shape, dtype=np.uint8, buffer=blocks[-1].buf)
+        return blocks, arrays
+
+    def detach(blocks, arrays):
+        arrays.clear()
+        for block in blocks:
+            block.close()
+
+    def close(self):
+        '''
+        Release and unlink every block.
+        '''
+        self.arrays.clear()
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+class ParallelKeygen:
+
+    def __init__(self):
+        pass
+
+    def compose_central(spec, start, stop, sizes):
+        '''
+        Worker : forms[p] = L2hat^T * central[p] * L2hat for polynomials start to stop.
+
+        sizes[p] is the (vl, ol) of polynomial p's layer. Only its rows 0 .. vl + ol - 1, n and
+        columns 0 .. vl - 1, n can be non zero, as in `rainbowKeygen.generate_polynomial`.
+        '''
+        blocks, arrays = SharedArrays.attach(spec)
+        try:
+            n = arrays['L2hat'].shape[0] - 1
+            for p in range(start, stop):
+                vl, ol = sizes[p - start]
+                rows = list(range(vl + ol)) + [n]
+                cols = list(range(vl)) + [n]
+                Q = arrays['central'][p][rows][:, cols]
+                arrays['forms'][p] = GF256np.multiply_matrices(arrays['L2hat'][rows].T, GF256np.multiply_matrices(Q, arrays['L2hat'][cols]))
+        finally:
+            SharedArrays.detach(blocks, arrays)
+
+    def mix_rows(spec, start, stop):
+        '''
+        Worker : rows start to stop of L1 * forms, plus b1 on the constant terms.
+        '''
+        blocks, arrays = SharedArrays.attach(spec)
+        try:
+            m, n1 = arrays['forms'].shape[:2]
+            mixed = GF256np.multiply_matrices(arrays['L1'][start:stop], arrays['forms'].reshape(m, -1))
+            mixed = mixed.reshape(stop - start, n1, n1)
+            mixed[:, n1 - 1, n1 - 1] ^= arrays['b1'][start:stop]
+            arrays['mixed'][start:stop] = mixed
+        finally:
+            SharedArrays.detach(blocks, arrays)
+
+    def shapes(m, n1):
+        '''
+        Shapes of the shared blocks `compose` allocates for m forms in n1 = n + 1 variables.
+        '''
+        return {'L1': (m, m), 'b1': (m,), 'L2hat': (n1, n1), 'central': (m, n1, n1), 'forms': (m, n1, n1), 'mixed': (m, n1, n1)}
+
+    def compose(L1, b1, L2hat, F_layers, processes):
+        '''
+        Compute the m homogeneous public forms L1 * (L2hat^T * F * L2hat) + b1 with `processes` workers.
+
+        Both stages are split by output row : first the m central polynomials are composed
+        with L2, then every worker mixes its own rows of L1 with all of them. Operands and
+        results stay in shared memory, and the arithmetic is the serial path's, so the forms are
+        bit-identical to it.
+        '''
+        L1 = GF256np.asfield(L1)
+        L2hat = GF256np.asfield(L2hat)
+        m, n1 = len(L1), len(L2hat)
+        n = n1 - 1
+
+        with SharedArrays(ParallelKeygen.shapes(m, n1)) as shared:
+            arrays = shared.arrays
+            arrays['L1'][...] = L1
+            arrays['b1'][...] = GF256np.asfield(b1)
+            arrays['L2hat'][...] = L2hat
+
+            # Central forms, each in its full (n+1) x (n+1) position
+            sizes = list()
+            p = 0
+            for layer in F_layers:
+                vl, ol = len(layer[0]['alphas'][0]), len(layer[0]['betas'])
+                for poly in layer:
+                    central = arrays['central'][p]
+                    central[:vl, :vl] = poly['alphas']
+                    central[vl:vl + ol, :vl] = poly['betas']
+                    central[:vl + ol, n] = poly['gammas'][0]
+                    central[n, n] = poly['etas'][0]
+                    sizes.append((vl, ol))
+                    p += 1
+
+            chunks = [(int(c[0]), int(c[-1]) + 1) for c in np.array_split(np.arange(m), min(processes, m)) if len(c)]
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                list(pool.map(ParallelKeygen.compose_central, *zip(*[(shared.spec, start, stop, sizes[start:stop]) for start, stop in chunks])))
+                list(pool.map(ParallelKeygen.mix_rows, *zip(*[(shared.spec, start, stop) for start, stop in chunks])))
+
+            return arrays['mixed'].copy()
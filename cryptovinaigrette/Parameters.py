@@ -0,0 +1,89 @@
+'''
+Named Rainbow parameter sets with fixed layer sizes.
+'''
+
+class ParameterErrors(Exception): pass
+
+# -------------------- Module -------------------- #
+class RainbowParameters:
+    def __init__(self, name, v, k=8):
+        '''
+        Fixed Rainbow layer structure.
+
+        Parameters:
+            name - Name of the parameter set
+            v - Number of vinegar variables of every layer, ending with n, e.g. (36, 68, 100)
+                for 36 vinegars followed by two layers of 32 oils
+            k - Finite space of elements
+
+        The sizes of the keys and signatures follow from v alone, see `sizes`.
+        '''
+        self.name = name
+        self.v = tuple(int(i) for i in v)
+        self.k = int(k)
+        RainbowParameters.validate(self.v)
+        self.n = self.v[-1]
+        self.u = len(self.v)
+        self.m = self.n - self.v[0]
+
+    def validate(v):
+        '''
+        Check a layer structure, raising ParameterErrors when it cannot be used.
+        '''
+        if len(v) < 2:
+            raise ParameterErrors("Need at least one layer : v = " + str(list(v)))
+        if v[0] < 1:
+            raise ParameterErrors("The first layer needs at least one vinegar variable : v = " + str(list(v)))
+        if any(b <= a for a, b in zip(v, v[1:])):
+            raise ParameterErrors("Every layer needs at least one oil variable : v = " + str(list(v)))
+        if v[-1] > 0xffff:
+            raise ParameterErrors("n = " + str(v[-1]) + " does not fit the key file header")
+
+    def sizes(self):
+        '''
+        Sizes in bytes of the signature and of the binary key files.
+        '''
+        n, m, v = self.n, self.m, self.v
+        header = 12 + 2 * len(v)
+        private = 2 * m * m + m + 2 * n * n + n
+        for vl, vn in zip(v, v[1:]):
+            ol = vn - vl
+            private += ol * (vl * vl + ol * vl + vl + ol + 1)
+
+        # Coefficients derived from the public seed : on rows v[l] - v[0] and below, the
+        # monomials in the first v[l] variables that are not in the first v[l - 1]
+        seeded, previous = 0, 0
+        for vl in v[:-1]:
+            columns = vl * (vl + 1) // 2 + vl + 1
+            seeded += (m - vl + v[0]) * (columns - previous)
+            previous = columns
+
+        public = m * (n * (n + 1) // 2 + n + 1)
+        return {
+            'signature': n,
+            'public_key': header + public,
+            'compressed_public_key': header + 32 + public - seeded,
+            'private_key': header + private,
+            'seed_private_key': header + 33,
+        }
+
+    def __repr__(self):
+        return "RainbowParameters(" + repr(self.name) + ", v=" + str(self.v) + ")"
+
+presets = {p.name: p for p in [
+    RainbowParameters('cv-24', (12, 18, 24)),
+    RainbowParameters('cv-32', (12, 22, 32)),
+    RainbowParameters('cv-64', (24, 44, 64)),
+    # Layer structure of Rainbow Ia : 36 vinegars, then two layers of 32 oils
+    RainbowParameters('rainbow-Ia', (36, 68, 100)),
+]}
+
+def get_parameters(params):
+    '''
+    Resolve a preset name or a RainbowParameters object.
+    '''
+    if isinstance(params, RainbowParameters):
+        return params
+    if params not in presets:
+        raise ParameterErrors("Unknown parameter set " + repr(params) + "! Presets : " + ", ".join(presets))
+    return presets[params]
@@ -0,0 +1,54 @@
+'''
+Fixed-length binary encoding of signatures.
+
+Layout (little endian):
+    magic (4 bytes)  - b'CVSG'
+    version (u16), n (u16)
+    signature (n bytes) - one field element per byte
+'''
+
+# -------------------- Imports -------------------- #
+import numpy as np
+from .Formats import Formats
+
+class SignatureFileErrors(Exception): pass
+
+# -------------------- Module -------------------- #
+class SignatureFile:
+
+    version = Formats.version
+    magic = Formats.signature_magic
+    header = Formats.signature_header
+
+    def __init__(self):
+        pass
+
+    def encode(signature):
+        '''
+        Encode a signature of n field elements as header.size + n bytes.
+        '''
+        signature = np.asarray(signature)
+        if signature.ndim != 1 or (signature.size and (signature.min() < 0 or signature.max() > 255)):
+            raise SignatureFileErrors("Signature must be a sequence of field elements!")
+        return Formats.pack_signature_header(len(signature)) + signature.astype(np.uint8).tobytes()
+
+    def decode(data):
+        '''
+        Decode an encoded signature back into a list of ints.
+        '''
+        return list(Formats.unpack_signature(data, SignatureFileErrors))
+
+    def is_signature_file(path):
+        '''
+        Check whether the file at path is a binary signature (as opposed to a dill pickle).
+        '''
+        with open(path, 'rb') as sFile:
+            return sFile.read(4) == SignatureFile.magic
+
+    def save(signature, path):
+        with open(path, 'wb') as sFile:
+            sFile.write(SignatureFile.encode(signature))
+
+    def load(path):
+        with open(path, 'rb') as sFile:
+            return SignatureFile.decode(sFile.read())
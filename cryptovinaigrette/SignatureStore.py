@@ -0,0 +1,171 @@
+'''
+Append-only store of signatures, memory-mapped for batch verification.
+
+Layout (little endian):
+    magic (4 bytes)  - b'CVST'
+    version (u16), n (u16), digest size (u16), key id size (u16)
+    records, each of key id size + digest size + n bytes :
+        key id    - `SignatureStore.key_id` of the public key the signature is checked with
+        digest    - raw digest of the document (see `MessageDigest`)
+        signature - n field elements, one per byte
+'''
+
+# -------------------- Imports -------------------- #
+import hashlib, mmap, os, struct, threading
+from .cryptovinaigrette import *
+
+class SignatureStoreErrors(Exception): pass
+
+# -------------------- Module -------------------- #
+class SignatureStore:
+
+    version = 1
+    magic = b'CVST'
+    header = struct.Struct('<4sHHHH')
+    key_id_size = 16
+
+    def __init__(self, path, n=None, digest_size=None):
+        '''
+        Open the store at path, creating it for signatures of n elements if it does not exist.
+
+        Parameters:
+            path - Path of the store file
+            n - Number of elements of every signature, required to create a store
+            digest_size - Bytes per document digest, by default that of `MessageDigest`
+
+        Records are only ever appended. `records` maps the file and views it as a structured
+        array without copying or decoding anything, so `verify` can feed millions of records
+        straight into `CompiledPublicKey.verify_batch`. A record cut short by a crash during an
+        append is dropped when the store is opened again.
+        '''
+        self.path = path
+        self.lock = threading.Lock()
+        self.buf = None
+
+        if not os.path.exists(path) or not os.path.getsize(path):
+            if n is None:
+                raise SignatureStoreErrors("Need n to create the signature store " + str(path) + "!")
+            if digest_size is None:
+                digest_size = MessageDigest.new().digest_size
+            with open(path, 'wb') as sFile:
+                sFile.write(SignatureStore.header.pack(SignatureStore.magic, SignatureStore.version, n, digest_size, SignatureStore.key_id_size))
+
+        with open(path, 'rb') as sFile:
+            header = sFile.read(SignatureStore.header.size)
+        if len(header) < SignatureStore.header.size:
+            raise SignatureStoreErrors("Signature store is truncated!")
+        magic, version, self.n, self.digest_size, key_size = SignatureStore.header.unpack(header)
+        if magic != SignatureStore.magic:
+            raise SignatureStoreErrors("Not a signature store!")
+        if version != SignatureStore.version:
+            raise SignatureStoreErrors("Unsupported signature store version " + str(version) + "!")
+        if n is not None and n != self.n:
+            raise SignatureStoreErrors("Signature store holds signatures of n = " + str(self.n) + ", not " + str(n) + "!")
+
+        self.dtype = np.dtype([('key', np.uint8, (key_size,)), ('digest', np.uint8, (self.digest_size,)), ('signature', np.uint8, (self.n,))])
+
+        # Appends must start on a record boundary
+        partial = (os.path.getsize(path) - SignatureStore.header.size) % self.dtype.itemsize
+        if partial:
+            os.truncate(path, os.path.getsize(path) - partial)
+        self.file = open(path, 'ab')
+
+    def key_id(pubKey):
+        '''
+        Identifier of a public key (any key object, or a `CompiledPublicKey`) : a truncated SHA-256 of its coefficients.
+        '''
+        if not isinstance(pubKey, CompiledPublicKey):
+            pubKey = PublicKey.from_key(pubKey)
+        h = hashlib.sha256(struct.pack('<HH', pubKey.n, pubKey.v0))
+        h.update(np.ascontiguousarray(pubKey.coefficients).tobytes())
+        return h.digest()[:SignatureStore.key_id_size]
+
+    def append(self, key_id, digest, signature):
+        '''
+        Append one record.
+        '''
+        self.extend(key_id, [digest], [signature])
+
+    def extend(self, key_id, digests, signatures):
+        '''
+        Append one record per (digest, signature) pair, all under the key key_id, in one write.
+        '''
+        if not isinstance(digests, np.ndarray):
+            digests = [bytearray(digest) for digest in digests]
+        digests = GF256np.asfield(digests, "Digest")
+        signatures = GF256np.asfield(signatures, "Signature")
+        if len(digests) != len(signatures):
+            raise ValueError("Need one digest per signature! " + str(len(digests)) + " vs " + str(len(signatures)))
+        if len(bytes(key_id)) != self.dtype['key'].shape[0]:
+            raise SignatureStoreErrors("Key id must be " + str(self.dtype['key'].shape[0]) + " bytes!")
+
+        records = np.zeros(len(signatures), dtype=self.dtype)
+        if not len(records):
+            return
+        if digests.shape[1:] != (self.digest_size,) or signatures.shape[1:] != (self.n,):
+            raise SignatureStoreErrors("Records need digests of " + str(self.digest_size) + " bytes and signatures of " + str(self.n) + " elements!")
+        records['key'] = np.frombuffer(bytes(key_id), dtype=np.uint8)
+        records['digest'] = digests
+        records['signature'] = signatures
+
+        with self.lock:
+            self.file.write(records.tobytes())
+
+    def flush(self):
+        with self.lock:
+            self.file.flush()
+
+    def records(self):
+        '''
+        All complete records as a read-only structured array (fields key, digest and signature)
+        viewing the mapped file.
+        '''
+        with self.lock:
+            self.file.flush()
+            size = os.path.getsize(self.path)
+            if self.buf is None or len(self.buf) != size:
+                with open(self.path, 'rb') as sFile:
+                    self.buf = mmap.mmap(sFile.fileno(), 0, access=mmap.ACCESS_READ)
+            buf = self.buf
+
+        count = (len(buf) - SignatureStore.header.size) // self.dtype.itemsize
+        return np.frombuffer(buf, dtype=self.dtype, count=count, offset=SignatureStore.header.size)
+
+    def __len__(self):
+        return len(self.records())
+
+    def verify(self, keyFile, start=0, stop=None, chunk=65536):
+        '''
+        Verify records start to stop under one public key, returning one boolean per record.
+
+        Records stored under another key id are reported False. Targets are derived from the
+        stored digests in bulk with `rainbowKeygen.digest_targets_batch`, and `chunk` records at a
+        time are checked with `CompiledPublicKey.verify_batch`.
+        '''
+        pubKey = rainbowKeygen.public_key(keyFile)
+        if pubKey.n != self.n:
+            raise SignatureStoreErrors("Public key has n = " + str(pubKey.n) + ", the store holds signatures of n = " + str(self.n) + "!")
+
+        records = self.records()[start:stop]
+        key = np.frombuffer(SignatureStore.key_id(pubKey), dtype=np.uint8)
+        ret = np.zeros(len(records), dtype=bool)
+        with Metrics.timer('store.verify', size=len(records)):
+            for begin in range(0, len(records), chunk):
+                batch = records[begin:begin + chunk]
+                targets = rainbowKeygen.digest_targets_batch(pubKey.n, pubKey.v0, batch['digest'])
+                ok = pubKey.verify_batch(batch['signature'], targets)
+                ret[begin:begin + chunk] = ok & (batch['key'] == key).all(axis=1)
+
+        return ret
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+            self.buf = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,331 @@
+'''
+Long-lived signing daemon serving sign and verify requests over a Unix-domain socket.
+
+Protocol : every message, in both directions, is one frame
+    length (u32, big endian) - number of bytes that follow
+    body
+
+Request bodies start with an opcode byte :
+    0x01 SIGN    digest                      -> signature (n bytes)
+    0x02 VERIFY  signature (n bytes) digest  -> 0x00 or 0x01
+    0x03 INFO                                -> n (u16), v0 (u16), has public key (u8)
+Digests are the raw bytes mapped to targets by `rainbowKeygen.digest_targets`.
+
+Response bodies start with a status byte : 0x00 followed by the result, or 0x01 followed by
+a UTF-8 error message.
+'''
+
+# -------------------- Imports -------------------- #
+import os, queue, socket, socketserver, stat, struct, threading, time
+from .cryptovinaigrette import *
+
+class SigningDaemonErrors(Exception): pass
+
+# -------------------- Module -------------------- #
+SIGN, VERIFY, INFO = 1, 2, 3
+OK, ERROR = 0, 1
+
+length = struct.Struct('>I')
+max_frame = 1 << 20
+
+def send_frame(sock, body):
+    sock.sendall(length.pack(len(body)) + body)
+
+def recv_exactly(sock, count):
+    ret = bytearray()
+    while len(ret) < count:
+        chunk = sock.recv(count - len(ret))
+        if not chunk:
+            return None
+        ret += chunk
+    return bytes(ret)
+
+def recv_frame(sock):
+    '''
+    Read one frame, returning None when the peer closed the connection.
+    '''
+    header = recv_exactly(sock, length.size)
+    if header is None:
+        return None
+    size = length.unpack(header)[0]
+    if size > max_frame:
+        raise SigningDaemonErrors("Frame of " + str(size) + " bytes is too large!")
+    body = recv_exactly(sock, size)
+    if body is None:
+        raise SigningDaemonErrors("Connection closed in the middle of a frame!")
+    return body
+
+class Request:
+    def __init__(self, op, payload):
+        self.op = op
+        self.payload = payload
+        self.reply = None
+        self.done = threading.Event()
+
+    def answer(self, reply):
+        self.reply = reply
+        self.done.set()
+
+class RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                body = recv_frame(self.request)
+            except (SigningDaemonErrors, OSError):
+                return
+            if body is None:
+                return
+            send_frame(self.request, self.server.daemon.submit(body))
+
+class SigningServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class SigningDaemon:
+    def __init__(self, keyFile, path, pubKeyFile=None, pool=64, window=0.002, max_batch=64, field=GF256np):
+        '''
+        Serve a private key loaded once over the Unix socket at path.
+
+        Parameters:
+            keyFile - Path to (or object of) the private key
+            path - Path of the Unix socket, created with mode 0600
+            pubKeyFile - Public key used for VERIFY requests, if any
+            pool - Size of the `VinegarPool` of precomputed first-layer systems, 0 to disable it
+            window - Seconds the batcher waits for more requests after the first one
+            max_batch - Maximum number of requests handled per batch
+            field - Finite field backend used for signing
+
+        Connections are served by one thread each, but every request goes through a single
+        batcher thread : requests arriving within `window` are handled together, with all their
+        VERIFY requests checked in one `CompiledPublicKey.verify_batch`.
+        '''
+        self.privKey = rainbowKeygen.private_key(keyFile)
+
+        self.pubKey = None
+        if pubKeyFile is not None:
+            self.pubKey = rainbowKeygen.public_key(pubKeyFile)
+            if (self.pubKey.n, self.pubKey.v0) != (self.privKey.n, self.privKey.v0):
+                raise SigningDaemonErrors("Public and private keys do not match!")
+
+        self.signer = VinegarPool(self.privKey, size=pool, field=field) if pool else self.privKey
+        self.path = path
+        self.window = window
+        self.max_batch = max_batch
+        self.field = field
+        self.requests = queue.Queue()
+        self.stopped = threading.Event()
+        self.server = None
+        self.threads = list()
+        # (st_dev, st_ino) of the socket file bound by `start`, the only file `stop` removes
+        self.bound = None
+
+    def submit(self, body):
+        '''
+        Queue one request body for the batcher and wait for its response body.
+        '''
+        if not body:
+            return bytes([ERROR]) + b"Empty request!"
+        request = Request(body[0], body[1:])
+        self.requests.put(request)
+        request.done.wait()
+        return request.reply
+
+    def next_batch(self):
+        '''
+        Wait for a request, then collect more until `window` has passed or `max_batch` is reached.
+        '''
+        try:
+            batch = [self.requests.get(timeout=0.1)]
+        except queue.Empty:
+            return list()
+
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def process(self, batch):
+        Metrics.count('daemon.batch', len(batch))
+        verifies = list()
+        for request in batch:
+            try:
+                if request.op == SIGN:
+                    signature = rainbowKeygen.sign_digest(self.signer, request.payload, self.field)
+                    request.answer(bytes([OK]) + bytes(int(i) for i in signature))
+                elif request.op == VERIFY:
+                    if self.pubKey is None:
+                        raise SigningDaemonErrors("No public key loaded!")
+                    n = self.pubKey.n
+                    if len(request.payload) <= n:
+                        raise SigningDaemonErrors("VERIFY needs a signature of " + str(n) + " bytes and a digest!")
+                    y = rainbowKeygen.digest_targets(n, self.pubKey.v0, request.payload[n:])
+                    verifies.append((request, list(request.payload[:n]), y))
+                elif request.op == INFO:
+                    request.answer(bytes([OK]) + struct.pack('>HHB', self.privKey.n, self.privKey.v0, self.pubKey is not None))
+                else:
+                    raise SigningDaemonErrors("Unknown opcode " + str(request.op) + "!")
+            except Exception as e:
+                request.answer(bytes([ERROR]) + str(e).encode('utf-8'))
+
+        if verifies:
+            try:
+                ok = self.pubKey.verify_batch([v[1] for v in verifies], [v[2] for v in verifies])
+                for (request, signature, y), result in zip(verifies, ok):
+                    request.answer(bytes([OK, int(result)]))
+            except Exception as e:
+                for request, signature, y in verifies:
+                    request.answer(bytes([ERROR]) + str(e).encode('utf-8'))
+
+    def batcher(self):
+        while not self.stopped.is_set():
+            batch = self.next_batch()
+            if batch:
+                self.process(batch)
+
+    def start(self):
+        '''
+        Bind the socket and serve in background threads.
+
+        A stale socket left at the path is replaced; any other file there is an error.
+        '''
+        if os.path.lexists(self.path):
+            if not stat.S_ISSOCK(os.lstat(self.path).st_mode):
+                raise SigningDaemonErrors(str(self.path) + " exists and is not a socket!")
+            os.remove(self.path)
+        umask = os.umask(0o177)
+        try:
+            self.server = SigningServer(self.path, RequestHandler)
+        finally:
+            os.umask(umask)
+        info = os.lstat(self.path)
+        self.bound = (info.st_dev, info.st_ino)
+        self.server.daemon = self
+
+        if isinstance(self.signer, VinegarPool):
+            self.signer.start()
+        self.stopped.clear()
+        self.threads = [
+            threading.Thread(target=self.batcher, daemon=True),
+            threading.Thread(target=self.server.serve_forever, daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        '''
+        Stop serving and remove the socket bound by `start`.
+        '''
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        self.stopped.set()
+        for thread in self.threads:
+            thread.join()
+        self.threads = list()
+        if isinstance(self.signer, VinegarPool):
+            self.signer.stop()
+        if self.bound is not None:
+            try:
+                info = os.lstat(self.path)
+                if (info.st_dev, info.st_ino) == self.bound:
+                    os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.bound = None
+
+    def serve_forever(self):
+        '''
+        Serve until interrupted.
+        '''
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+class SigningClient:
+    def __init__(self, path, timeout=None):
+        '''
+        Client of a `SigningDaemon` listening on the Unix socket at path.
+
+        One connection is kept open and shared; calls from several threads are serialised.
+        Messages are hashed locally, only their digests are sent.
+        '''
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self.lock = threading.Lock()
+
+    def call(self, op, payload=b''):
+        with self.lock:
+            send_frame(self.sock, bytes([op]) + payload)
+            body = recv_frame(self.sock)
+        if body is None:
+            raise SigningDaemonErrors("Daemon closed the connection!")
+        if body[0] != OK:
+            raise SigningDaemonErrors(body[1:].decode('utf-8', 'replace'))
+        return body[1:]
+
+    def info(self):
+        '''
+        Return (n, v0, has public key) of the daemon's key.
+        '''
+        n, v0, public = struct.unpack('>HHB', self.call(INFO))
+        return n, v0, bool(public)
+
+    def sign_digest(self, digest):
+        return list(self.call(SIGN, bytes(digest)))
+
+    def sign(self, msgFile):
+        '''
+        Sign the message at msgFile (or bytes, or file object).
+        '''
+        return self.sign_digest(MessageDigest.digest(msgFile))
+
+    def verify_digest(self, signature, digest):
+        return self.call(VERIFY, bytes(int(i) for i in signature) + bytes(digest)) == b'\x01'
+
+    def verify(self, signature, msgFile):
+        '''
+        Verify the signature of the message at msgFile with the daemon's public key.
+        '''
+        return self.verify_digest(signature, MessageDigest.digest(msgFile))
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Serve a private key over a Unix socket')
+    parser.add_argument('key', help='private key file')
+    parser.add_argument('socket', help='path of the Unix socket')
+    parser.add_argument('--public', help='public key file, enables VERIFY requests')
+    parser.add_argument('--pool', type=int, default=64, help='precomputed first-layer systems, 0 to disable')
+    parser.add_argument('--window', type=float, default=0.002, help='seconds to wait for more requests per batch')
+    options = parser.parse_args()
+
+    SigningDaemon(options.key, options.socket, options.public, pool=options.pool, window=options.window).serve_forever()
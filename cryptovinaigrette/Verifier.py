@@ -0,0 +1,205 @@
+'''
+Signature verification on the standard library alone, for processes that only verify.
+
+`import cryptovinaigrette.Verifier` loads neither numpy nor the keygen : public keys are read
+from the binary key files of `KeyFile` (b'CVPK' and b'CVPC', never dill pickles) and signatures
+from those of `SignatureFile` or from plain sequences of field elements. The layouts, the
+compressed key regions and the digest to target mapping all come from `Formats`, which the
+numpy code uses too; only the GF(256) arithmetic is this module's own. Products are
+done a whole column at a time with bytes.translate, so verifying costs about as much as in
+`CompiledPublicKey` for the parameter sets in `presets`.
+
+Usage:
+    python -m cryptovinaigrette.Verifier cvPub.pub FILE [FILE.sig]
+'''
+
+# -------------------- Imports -------------------- #
+import sys
+from .Formats import Formats
+from .MessageDigest import MessageDigest
+
+class VerifierErrors(Exception): pass
+
+# -------------------- Module -------------------- #
+def product_tables():
+    '''
+    tables[t] maps every byte b to the GF(256) product t * b, modulo x^8 + x^6 + x^3 + x^2 + 1 as in `GF256`.
+    '''
+    exponents = bytearray(255)
+    x = 1
+    for i in range(255):
+        exponents[i] = x
+        x <<= 1
+        if x & 0x100:
+            x ^= 0x14D
+
+    # log(0) points at the zero appended to every rotated row of exponents
+    logarithms = bytearray(256)
+    for i, x in enumerate(exponents):
+        logarithms[x] = i
+    logarithms[0] = 255
+    logarithms = bytes(logarithms)
+
+    tables = [bytes(256)]
+    for t in range(1, 256):
+        shift = logarithms[t]
+        tables.append(logarithms.translate(bytes(exponents[shift:] + exponents[:shift]) + b'\x00'))
+    return tables
+
+products = product_tables()
+
+class Verifier:
+
+    def __init__(self, keyFile):
+        '''
+        Public key ready to verify signatures.
+
+        Parameters:
+            keyFile - Path of a public key file, or its contents as a bytes-like object
+
+        Compressed keys are expanded here, once. The coefficients are kept one column (one
+        monomial over all m public polynomials) per bytes object, which is what `evaluate` scales.
+        '''
+        if isinstance(keyFile, (bytes, bytearray, memoryview)):
+            data = bytes(keyFile)
+        else:
+            with open(keyFile, 'rb') as kFile:
+                data = kFile.read()
+
+        magic, n, k, v, offset = Formats.unpack_key_header(data, VerifierErrors)
+        m, width = n - v[0], Formats.public_width(n)
+        if magic == Formats.compressed_magic:
+            seed = data[offset:offset + Formats.seed_size]
+            coefficients = Verifier.expand(n, v, seed, data[offset + Formats.seed_size:])
+        elif magic == Formats.public_magic:
+            coefficients = data[offset:]
+            if len(coefficients) != m * width:
+                raise VerifierErrors("Public key of n = " + str(n) + " needs " + str(m * width) + " coefficients, got " + str(len(coefficients)))
+        else:
+            raise VerifierErrors("Not a public key file!")
+
+        self.n = n
+        self.v = tuple(v)
+        self.v0 = v[0]
+        self.m = m
+        self.columns = [coefficients[j::width] for j in range(width)]
+
+    def runs(columns):
+        '''
+        Sorted columns as a list of contiguous (start, stop) ranges.
+        '''
+        ret = list()
+        for c in columns:
+            if ret and ret[-1][1] == c:
+                ret[-1][1] = c + 1
+            else:
+                ret.append([c, c + 1])
+        return ret
+
+    def expand(n, v, seed, stored):
+        '''
+        Row-major coefficients of a compressed public key, rebuilt like `CompressedPublicKey.expand`.
+        '''
+        if len(seed) != Formats.seed_size:
+            raise VerifierErrors("Key file is truncated!")
+        m, width = n - v[0], Formats.public_width(n)
+        regions = Formats.regions(n, v)
+
+        # The seed stream, as `FieldRandom(source='shake', seed=seed)` draws it
+        needed = sum((m - start) * len(columns) for start, columns in regions)
+        stream = b''.join(Formats.xof_block(seed, i) for i in range(-(-needed // Formats.xof_chunk)))
+
+        # Rows covered by the same regions have the same layout : seed-derived runs per region, stored runs in between
+        layouts, blocks, offset = list(), list(), 0
+        for layer, (start, columns) in enumerate(regions):
+            blocks.append((start, len(columns), offset, Verifier.runs(columns)))
+            offset += (m - start) * len(columns)
+            seeded = set(c for s, cs in regions[:layer + 1] for c in cs)
+            layouts.append(Verifier.runs([c for c in range(width) if c not in seeded]))
+
+        if len(stored) != sum(sum(b - a for a, b in layouts[sum(s <= row for s, cs in regions) - 1]) for row in range(m)):
+            raise VerifierErrors("Compressed key of n = " + str(n) + " has the wrong number of stored coefficients!")
+
+        ret = bytearray(m * width)
+        position = 0
+        for row in range(m):
+            base = row * width
+            active = sum(start <= row for start, columns in regions)
+            for a, b in layouts[active - 1]:
+                ret[base + a:base + b] = stored[position:position + b - a]
+                position += b - a
+            for start, size, offset, runs in blocks[:active]:
+                source = offset + (row - start) * size
+                for a, b in runs:
+                    ret[base + a:base + b] = stream[source:source + b - a]
+                    source += b - a
+
+        return bytes(ret)
+
+    def decode_signature(data):
+        '''
+        Field elements of a signature encoded by `SignatureFile.encode`.
+        '''
+        return Formats.unpack_signature(data, VerifierErrors)
+
+    def load_signature(path):
+        '''
+        Read a signature file written by `rainbowKeygen.save_signature`.
+        '''
+        with open(path, 'rb') as sFile:
+            return Verifier.decode_signature(sFile.read())
+
+    def evaluate(self, signature):
+        '''
+        Values of the m public polynomials at the signature, as bytes.
+        '''
+        try:
+            x = bytes(signature)
+        except (TypeError, ValueError):
+            raise ValueError("Signature must be a sequence of field elements!")
+        if len(x) != self.n:
+            raise ValueError("Signature has " + str(len(x)) + " elements, expected " + str(self.n))
+
+        # Monomials in column order : x_j * x_k for j <= k, then x_j, then 1
+        monomials = b''.join(x[j:].translate(products[t]) for j, t in enumerate(x)) + x + b'\x01'
+
+        # GF(256) addition is XOR, so the m sums are accumulated side by side in one integer
+        acc = 0
+        for column, t in zip(self.columns, monomials):
+            if t:
+                acc ^= int.from_bytes(column.translate(products[t]), 'little')
+        return acc.to_bytes(self.m, 'little')
+
+    def verify_digest(self, signature, digest):
+        '''
+        Verify the signature of a precomputed message digest.
+        '''
+        return self.evaluate(signature) == Formats.digest_targets(self.n, self.v0, digest)
+
+    def verify(self, signature, msgFile):
+        '''
+        Verify the signature of a message given as a path, bytes-like object or open file object.
+        '''
+        return self.verify_digest(signature, MessageDigest.digest(msgFile))
+
+def main(argv=None):
+    '''
+    Verify one signed file, returning 0 when the signature holds, 1 when it does not and 2 on errors.
+    '''
+    import argparse
+    parser = argparse.ArgumentParser(prog='python -m cryptovinaigrette.Verifier', description='Verify a Rainbow signature')
+    parser.add_argument('key', help='public key file')
+    parser.add_argument('file', help='signed file')
+    parser.add_argument('signature', nargs='?', help='signature file (default: FILE.sig)')
+    options = parser.parse_args(argv)
+
+    try:
+        ok = Verifier(options.key).verify(Verifier.load_signature(options.signature or options.file + '.sig'), options.file)
+    except (OSError, ValueError, VerifierErrors) as e:
+        print('cryptovinaigrette:', e, file=sys.stderr)
+        return 2
+    print(options.file + ':', 'OK' if ok else 'FAILED')
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
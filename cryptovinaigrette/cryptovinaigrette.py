@@ -4,33 +4,50 @@ Generate UOV parameters and keys
 
 # -------------------- IMPORTS and Definitions -------------------- #
 
-import secrets, argparse, numpy as np
-import dill, errno, os, subprocess as sp, atexit, hashlib
+import numpy as np
+import os, hashlib, queue, threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime as dt
-from .Affine import *
+from types import SimpleNamespace
 from .GF256 import *
-
-class pubKeyClass: pass
-class privKeyClass: pass
+from .GF256np import *
+from .CompiledPublicKey import *
+from .Keys import *
+from .KeyFile import *
+from .KeyCache import *
+from .Metrics import *
+from .FieldRandom import *
+from .Formats import *
+from .MessageDigest import *
+from .Parameters import *
+from .SignatureFile import *
+
+# Keys loaded from a path by sign, verify and verify_batch, shared by the whole process
+key_cache = KeyCache()
+
+# Affine (multiprocessing, dill) and ParallelKeygen (shared memory, process pools) are only
+# imported by keygen, and dill only for keys and signatures pickled by earlier versions, so that
+# processes that only sign or verify do not pay for them. See `Verifier` for a verifier that
+# does not need numpy either.
 
 # -------------------- Command Line Args -------------------- #
 
 if __name__ == '__main__':
+    import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('-v', type=int, nargs='?', default=0)
     args = parser.parse_args()
     if args.v is None:
         args.v = 0 
 else:
-    args = argparse.Namespace()
-    args.v = 0
+    args = SimpleNamespace(v=0)
 
 
 # -------------------- Module -------------------- #
 
 class rainbowKeygen:
 
-    def __init__(self, n = 32, u = 5, k = 8, save=''):
+    def __init__(self, n = 32, u = 5, k = 8, save='', field=GF256np, workers=0, processes=0, params=None, seed=None, compressed=False):
         '''
         Initialise the key object
 
@@ -39,6 +56,21 @@ class rainbowKeygen:
             u - Number of layers
             k - Finite space of elements
             save - File to save as
+            field - Finite field backend, `GF256np` (numpy arrays) or `GF256` (plain lists)
+            workers - Number of subprocesses used to sample each affine map by rejection,
+                      0 (default) generates them in process
+            processes - Number of worker processes composing the public key, with operands in
+                        shared memory, 0 (default) composes it in process. The key is the same.
+            params - Name of a preset in `presets` (e.g. 'rainbow-Ia') or a `RainbowParameters`
+                     with fixed layer sizes; overrides n, u and k. Without it the layer sizes
+                     are drawn at random for the given n and u.
+            seed - 32 byte seed : every random component of the key is derived from it with
+                   SHAKE-256, so the same seed and parameters always give the same keys, and the
+                   private key is saved as the seed alone (a `SeedKey`). workers is ignored.
+                   True draws a fresh seed.
+            compressed - Generate a `CompressedPublicKey` : part of the public coefficients is
+                         expanded from a 32 byte public seed, and the central map is solved so
+                         that the public key takes those values. Only the others are stored.
 
         Private keys are saved as '.pem' files.
         Public keys are saved as '.pub' files.
@@ -50,61 +82,123 @@ class rainbowKeygen:
             b1, b2 - Translation elements for the corresponsing affine maps
 
         '''
+        if params is not None:
+            params = get_parameters(params)
+            n, u, k = params.n, params.u, params.k
+        elif not (2 <= u < n and u <= 255):
+            # generate_vinegars draws u distinct counts from 1 ... min(n - 1, 255)
+            raise ParameterErrors("Need 2 <= u < n and u <= 255, got n = " + str(n) + " u = " + str(u))
+
         self.n = n        
         self.u = u                  
         self.k = k
-        self.v = self.generate_vinegars()     
-        self.F_layers = self.generate_coefficients()
+        self.field = field
+        self.processes = processes
+        self.compressed = compressed
+        if seed is True:
+            seed = os.urandom(32)
+        self.seed = seed
+        streams = rainbowKeygen.seed_streams(seed)
+        with Metrics.timer('keygen.total', n=n, u=u):
+            with Metrics.timer('keygen.vinegars'):
+                self.v = list(params.v) if params is not None else self.generate_vinegars(streams['vinegars'])
+                RainbowParameters.validate(self.v)
+
+            self.generate_maps(streams, 0 if seed is not None else workers)
 
-        self.L1 = Affine(self.n - self.v[0], self.k)
-        self.L1.start_generators(20)
-        
-        self.L2 = Affine(self.n, self.k)
-        self.L2.start_generators(20)
+            if args.v:
+                print("Initialised with n :", self.n, ", k :", self.k, ", u :", self.u, "v :", self.v)
 
-        self.L1 = self.L1.retrieve()
-        self.L1, self.L1inv, self.b1 = self.L1['l'], self.L1['linv'], self.L1['b'] 
+            start = dt.now()
+            self.generate_keys(save)
+            end = dt.now()
+        if args.v:
+            print("Generated keys in", end - start, "seconds")
+
+    def seed_streams(seed):
+        '''
+        Independent random streams for the vinegars, F, L1, L2 and the public seed.
+
+        With a seed, each is SHAKE-256 keyed with SHAKE-256(label || seed); without one, all are
+        the shared `field_random`.
+        '''
+        labels = ('vinegars', 'F', 'L1', 'L2', 'public')
+        if seed is None:
+            return {label: field_random for label in labels}
+
+        seed = bytes(seed)
+        if len(seed) != 32:
+            raise ValueError("Seed must be 32 bytes, got " + str(len(seed)))
+        return {
+            label: FieldRandom(source='shake', seed=hashlib.shake_256(b'cryptovinaigrette/' + label.encode() + b'/' + seed).digest(32))
+            for label in labels
+        }
+
+    def generate_maps(self, streams, workers=0):
+        '''
+        Generate the central map F and the affine maps L1, L2 for the layers in self.v.
+        '''
+        from .Affine import Affine
 
-        self.L2 = self.L2.retrieve()
+        with Metrics.timer('keygen.coefficients'):
+            self.F_layers = self.generate_coefficients(streams['F'])
+
+        self.L1 = Affine(self.n - self.v[0], self.k, field=self.field)
+        self.L2 = Affine(self.n, self.k, field=self.field)
+
+        if workers:
+            self.L1.start_generators(workers)
+            self.L2.start_generators(workers)
+            with Metrics.timer('keygen.affine_l1', workers=workers):
+                self.L1 = self.L1.retrieve()
+            with Metrics.timer('keygen.affine_l2', workers=workers):
+                self.L2 = self.L2.retrieve()
+        else:
+            with Metrics.timer('keygen.affine_l1'):
+                self.L1 = self.L1.generate(streams['L1'])
+            with Metrics.timer('keygen.affine_l2'):
+                self.L2 = self.L2.generate(streams['L2'])
+
+        self.L1, self.L1inv, self.b1 = self.L1['l'], self.L1['linv'], self.L1['b'] 
         self.L2, self.L2inv, self.b2 = self.L2['l'], self.L2['linv'], self.L2['b']
 
-        if args.v:
-            print("Initialised with n :", self.n, ", k :", self.k, ", u :", self.u, "v :", self.v)
+        if self.compressed:
+            with Metrics.timer('keygen.public_seed'):
+                self.solve_public_seed(streams)
 
-        start = dt.now()
-        self.generate_keys(save)
-        end = dt.now()
-        if args.v:
-            print("Generated keys in", end - start, "seconds")
+    def expand_seed(seed, v, k=8, compressed=False):
+        '''
+        Rebuild the `PrivateKey` generated from seed for the layer sizes v.
+        '''
+        key = object.__new__(rainbowKeygen)
+        key.n, key.u, key.k, key.v = v[-1], len(v), k, list(v)
+        key.field = GF256np
+        key.compressed = compressed
+        with Metrics.timer('keygen.expand_seed'):
+            key.generate_maps(rainbowKeygen.seed_streams(seed))
+            return key.private_components()
 
     def generate_random_element() :
         '''
-        Generate a cryptographically secure random number within the finite field.
+        Generate a cryptographically secure non zero random number within the finite field.
         ''' 
-        num = GF256.get()
-        while not num :
-            num = GF256.get()
-        return num
+        return field_random.element(nonzero=True)
 
     def generate_random_matrix(x, y, k) :
         '''
         Generate 2D matrix with random elements below k
         '''
-        mat = [[0] * y for i in range(x)]
-        for i in range(x) :
-            for j in range(y):
-                mat[i][j] = rainbowKeygen.generate_random_element()
-        return mat
+        return field_random.elements((x, y), nonzero=True).tolist()
     
-    def generate_vinegars(self):
+    def generate_vinegars(self, rng=field_random):
         '''
         Generate vinegar variables for 'u' layers where the last layer has 'n' vinegars
         '''
         ret = list()
 
-        rnum = rainbowKeygen.generate_random_element()
+        rnum = rng.element(nonzero=True)
         while rnum > self.n or (rnum - self.n) >= (self.u):
-            rnum = rainbowKeygen.generate_random_element()
+            rnum = rng.element(nonzero=True)
 
 
         while True : 
@@ -113,9 +207,9 @@ class rainbowKeygen:
                 ret[-1] = self.n
                 break
 
-            rnum = rainbowKeygen.generate_random_element()
+            rnum = rng.element(nonzero=True)
 
-            if rnum not in ret and rnum != self.n and (rnum - self.n) < (self.u - len(ret)):
+            if rnum not in ret and rnum < self.n:
                 ret.append(rnum)
 
         if args.v:
@@ -123,7 +217,7 @@ class rainbowKeygen:
 
         return ret
 
-    def generate_coefficients(self):
+    def generate_coefficients(self, rng=field_random):
         '''
         Generate F - coefficients below 'k' for every polynomial in the keys
         '''
@@ -131,150 +225,274 @@ class rainbowKeygen:
 
         for _i in range(self.u - 1):
 
+            vl = self.v[_i]
             ol = self.v[_i + 1] - self.v[_i]
 
+            # One draw for the whole layer : alphas, betas, gammas and eta of every polynomial
+            sizes = [vl * vl, ol * vl, vl + ol, 1]
+            block = rng.elements((ol, sum(sizes)), nonzero=True)
+            alphas, betas, gammas, etas = np.split(block, np.cumsum(sizes)[:-1], axis=1)
+
             ret.append(list())
 
             for i in range(ol):
-                ret[-1].append(dict())
-                layer = ret[-1][-1]
-                
-                layer['alphas'] = list()
-                layer['betas'] = list()
-                layer['gammas'] = list()
-                layer['etas'] = list()
-
-                alphas = rainbowKeygen.generate_random_matrix(self.v[_i], self.v[_i], self.k)
-                betas = rainbowKeygen.generate_random_matrix(self.v[_i + 1] - self.v[_i], self.v[_i], self.k)
-                gammas = rainbowKeygen.generate_random_matrix(1, self.v[_i + 1], self.k)
-                etas = rainbowKeygen.generate_random_element()
-
-                layer['alphas'] = alphas
-                layer['betas'] = betas
-                layer['gammas'] = gammas
-                layer['etas'] = [etas]
+                layer = dict()
+                layer['alphas'] = alphas[i].reshape(vl, vl).tolist()
+                layer['betas'] = betas[i].reshape(ol, vl).tolist()
+                layer['gammas'] = gammas[i].reshape(1, vl + ol).tolist()
+                layer['etas'] = etas[i].tolist()
+                ret[-1].append(layer)
         
         if args.v:
             print("Done generating F map for each layer")
         
         return ret
     
-    def generate_polynomial(self, vl, ol, pcount, coefficients, polynomial):
+    def solve_public_seed(self, streams):
         '''
-        Generates polynomials for the Map F
+        Draw a public seed and re-solve part of F so that the public key takes the seed-derived
+        values of `CompressedPublicKey.regions`.
+
+        Write Q = L1^(-1) * (P + b1) for the composed forms F o L2, compacted. For every layer l,
+        the polynomials of layers l and above have free coefficients on all monomials in
+        z_0 ... z_{v[l] - 1} (alphas, the first v[l] gammas and eta). Setting x_{v[l]} ... x_{n - 1}
+        to 0 turns the composition with L2 into the congruence by the leading block M of L2hat,
+        so the coefficients of those polynomials that give given values on the monomials in
+        x_0 ... x_{v[l] - 1} are found with M^(-1), after removing what the rest of the polynomial
+        (betas and the oil gammas) contributes. On the layer's new columns, the public rows from
+        v[l] - v[0] on are prescribed : the trailing block of L1 turns them into targets for the
+        rows of Q of layers l and above, once the layers below are solved.
+
+        L1 and L2 are redrawn from their streams until the blocks used are invertible. The
+        composed forms are kept in self.composed for `generate_publickey`.
         '''
-        # Composition of F and L2
-        for _i in range(ol):
+        from .Affine import Affine
+
+        n, v = self.n, self.v
+        m = n - v[0]
+        width = n * (n + 1) // 2 + n + 1
+        self.public_seed = streams['public'].bytes(32)
+        regions = CompressedPublicKey.regions(n, v)
+        blocks = CompressedPublicKey.seed_blocks(self.public_seed, n, v)
 
-            # Multiply Alphas
-            for i in range(vl):
-                for j in range(vl):
-                    temp = GF256.multiply_scalar_vector(coefficients[_i]['alphas'][i][j], self.L2[i])
-                    polynomial.quadratic[pcount + _i] = GF256.add_matrices(polynomial.quadratic[pcount + _i], GF256.multiply_vectors(temp, self.L2[j]))
-                    temp = GF256.multiply_scalar_vector(self.b2[j], temp)
-                    polynomial.linear[pcount + _i] = GF256.add_vectors(temp, polynomial.linear[pcount + _i])
-                    temp = GF256.multiply_scalar_vector(coefficients[_i]['alphas'][i][j], self.L2[j])
-                    temp = GF256.multiply_scalar_vector(self.b2[i], temp)
-                    polynomial.linear[pcount + _i] = GF256.add_vectors(temp, polynomial.linear[pcount + _i])
-                    temp = GF256.multiply(coefficients[_i]['alphas'][i][j], self.b2[i])
-                    polynomial.constant[pcount + _i] = GF256.add(polynomial.constant[pcount + _i], GF256.multiply(temp, self.b2[j]))
-
-            # Multiply Betas    
+        while True:
+            L1 = GF256np.asfield(self.L1)
+            try:
+                trailing = [GF256np.find_inverse(L1[start:, start:]) for start, columns in regions]
+                break
+            except GF256Errors:
+                L1 = Affine(m, self.k, field=self.field).generate(streams['L1'])
+                self.L1, self.L1inv, self.b1 = L1['l'], L1['linv'], L1['b']
+
+        while True:
+            L2hat = rainbowKeygen.extend_affine(self.L2, self.b2)
+            try:
+                leading = [GF256np.find_inverse(L2hat[np.ix_(idx, idx)]) for idx in [list(range(vl)) + [n] for vl in v[:-1]]]
+                break
+            except GF256Errors:
+                L2 = Affine(n, self.k, field=self.field).generate(streams['L2'])
+                self.L2, self.L2inv, self.b2 = L2['l'], L2['linv'], L2['b']
+        self.L2hat = L2hat
+
+        targets = np.zeros((m, width), dtype=np.uint8)
+        self.composed = np.zeros((m, width), dtype=np.uint8)
+        b1 = GF256np.asfield(self.b1)
+
+        for layer, ((start, columns), block) in enumerate(zip(regions, blocks)):
+            if layer == 0:
+                # Every public row is prescribed : the constant column is the last one
+                block = block.copy()
+                block[:, -1] ^= b1
+                targets[:, columns] = GF256np.multiply_matrices(trailing[0], block)
+            else:
+                block = block ^ GF256np.multiply_matrices(L1[start:, :start], self.composed[:start][:, columns])
+                targets[start:, columns] = GF256np.multiply_matrices(trailing[layer], block)
+
+            vl, ol = v[layer], v[layer + 1] - v[layer]
+            free = CompressedPublicKey.columns(n, vl)
+            quads = vl * (vl + 1) // 2
+            rows, cols = np.triu_indices(vl)
             for i in range(ol):
-                for j in range(vl):
-                    temp = GF256.multiply_scalar_vector(coefficients[_i]['betas'][i][j], self.L2[i + vl])
-                    polynomial.quadratic[pcount + _i] = GF256.add_matrices(polynomial.quadratic[pcount + _i], GF256.multiply_vectors(temp, self.L2[j]))
-                    temp = GF256.multiply_scalar_vector(self.b2[j], temp)
-                    polynomial.linear[pcount + _i] = GF256.add_vectors(temp, polynomial.linear[pcount + _i])
-                    temp = GF256.multiply_scalar_vector(coefficients[_i]['betas'][i][j], self.L2[j])
-                    temp = GF256.multiply_scalar_vector(self.b2[i + vl], temp)
-                    polynomial.linear[pcount + _i] = GF256.add_vectors(temp, polynomial.linear[pcount + _i])
-                    temp = GF256.multiply(coefficients[_i]['betas'][i][j], self.b2[i + vl])
-                    polynomial.constant[pcount + _i] = GF256.add(polynomial.constant[pcount + _i], GF256.multiply(temp, self.b2[j]))
-            
-            # Multiply Gammas    
-            for i in range(vl + ol):
-                temp = GF256.multiply_scalar_vector(coefficients[_i]['gammas'][0][i], self.L2[i])
-                polynomial.linear[pcount + _i] = GF256.add_vectors(temp, polynomial.linear[pcount + _i])
-                polynomial.constant[pcount + _i] = GF256.add(polynomial.constant[pcount + _i], GF256.multiply(coefficients[_i]['gammas'][0][i], self.b2[i]))
-            
-            # Add Eta
-            polynomial.constant[pcount + _i] = GF256.add(polynomial.constant[pcount + _i], coefficients[_i]['etas'][0])
+                poly = self.F_layers[layer][i]
+
+                rest = dict(poly)
+                rest['alphas'] = np.zeros((vl, vl), dtype=np.uint8)
+                rest['gammas'] = np.array(poly['gammas'], dtype=np.uint8)
+                rest['gammas'][0, :vl] = 0
+                rest['etas'] = [0]
+                wanted = targets[start + i, free] ^ self.compose_polynomial(rest, vl, ol)[free]
+
+                # Form over (x_0 ... x_{vl - 1}, 1) with the wanted compact coefficients
+                form = np.zeros((vl + 1, vl + 1), dtype=np.uint8)
+                form[rows, cols] = wanted[:quads]
+                form[:vl, vl] = wanted[quads:quads + vl]
+                form[vl, vl] = wanted[-1]
+                solved = rainbowKeygen.compact_forms(GF256np.multiply_matrices(leading[layer].T, GF256np.multiply_matrices(form, leading[layer]))[None], vl)[0]
+
+                alphas = np.zeros((vl, vl), dtype=np.uint8)
+                alphas[rows, cols] = solved[:quads]
+                rest['gammas'][0, :vl] = solved[quads:quads + vl]
+                poly['alphas'] = alphas.tolist()
+                poly['gammas'] = rest['gammas'].tolist()
+                poly['etas'] = [int(solved[-1])]
+                self.composed[start + i] = self.compose_polynomial(poly, vl, ol)
+
+    def extend_affine(L, b):
+        '''
+        Affine map x -> L * x + b as a linear map on (x, 1).
+        '''
+        n = len(L)
+        ret = np.zeros((n + 1, n + 1), dtype=np.uint8)
+        ret[:n, :n] = GF256np.asfield(L)
+        ret[:n, n] = GF256np.asfield(b)
+        ret[n, n] = 1
+        return ret
+
+    def compose_polynomial(self, poly, vl, ol):
+        '''
+        Compose one central polynomial of a layer with vl vinegars and ol oils with L2, as a compact row.
+        '''
+        # Only rows of Q holding this layer's variables (and the constant row) are non zero,
+        # and only vinegar columns (and the constant column) are.
+        rows = list(range(vl + ol)) + [self.n]
+        cols = list(range(vl)) + [self.n]
+
+        Q = np.zeros((vl + ol + 1, vl + 1), dtype=np.uint8)
+        Q[:vl, :vl] = poly['alphas']
+        Q[vl:vl + ol, :vl] = poly['betas']
+        Q[:vl + ol, vl] = poly['gammas'][0]
+        Q[vl + ol, vl] = poly['etas'][0]
+
+        form = GF256np.multiply_matrices(self.L2hat[rows].T, GF256np.multiply_matrices(Q, self.L2hat[cols]))
+        return rainbowKeygen.compact_forms(form[None], self.n)[0]
+
+    def generate_polynomial(self, vl, ol, pcount, coefficients, polynomial):
+        '''
+        Generates polynomials for the Map F composed with L2
+
+        Every central polynomial is written as a homogeneous (n+1) x (n+1) form Q, so that
+        f(z) = (z, 1)^T * Q * (z, 1). With L2 extended to the (n+1) x (n+1) map Lhat taking
+        (x, 1) to (L2 * x + b2, 1), the composition is the single congruence Lhat^T * Q * Lhat,
+        which carries the quadratic, linear and constant terms at once. Each composed form is
+        compacted right away into row pcount + i of polynomial.compact.
+        '''
+        for _i in range(ol):
+            polynomial.compact[pcount + _i] = self.compose_polynomial(coefficients[_i], vl, ol)
         
         return
 
+    def compact_forms(forms, n):
+        '''
+        Compact stacked (n+1) x (n+1) homogeneous forms into public key rows
+        (x_j * x_k for j <= k, x_j, 1) : x_j * x_k and x_k * x_j share one coefficient.
+
+        Compaction is linear, so it commutes with the L1 mixing.
+        '''
+        rows, cols = np.triu_indices(n)
+        off = rows != cols
+        quads = forms[:, rows, cols]
+        quads[:, off] ^= forms[:, cols[off], rows[off]]
+        linear = forms[:, :n, n] ^ forms[:, n, :n]
+        return np.concatenate([quads, linear, forms[:, n, n, None]], axis=1)
+
+    def mix_rows(L1, b1, compact, chunk_bytes=1 << 20):
+        '''
+        L1 * compact + b1 on the constant column, accumulated in place into one preallocated buffer.
+
+        Output rows are processed in chunks so that the temporary product stays below chunk_bytes.
+        '''
+        L1 = GF256np.asfield(L1)
+        m, width = compact.shape
+        ret = np.zeros((m, width), dtype=np.uint8)
+        chunk = max(1, chunk_bytes // width)
+        for start in range(0, m, chunk):
+            out = ret[start:start + chunk]
+            for j in range(m):
+                np.bitwise_xor(out, GF256np.products[L1[start:start + chunk, j, None], compact[j]], out=out)
+        ret[:, -1] ^= GF256np.asfield(b1)
+        return ret, min(chunk, m) * width
+
     def generate_publickey(self, save=''):
         '''
         Generates the public key.
 
         Parameters:
             save - the destination folder
+
+        The central polynomials are composed with L2 one at a time and stored compacted (upper
+        triangle, linear and constant terms), then mixed by L1 in place. The size of the buffers
+        the composition allocates (shared blocks included, short-lived temporaries left out) is
+        kept in self.buffer_bytes and reported as 'keygen.buffer_bytes'. It is an estimate, not
+        a measured peak : measure that with tracemalloc, as test/benchmark.py does.
         '''
 
         if args.v:
             print("Generating public key...")
 
+        m = self.n - self.v[0]
+        width = self.n * (self.n + 1) // 2 + self.n + 1
+
+        # Affine map L2 : x -> L2 * x + b2 as a linear map on (x, 1)
+        self.L2hat = rainbowKeygen.extend_affine(self.L2, self.b2)
+        composed = getattr(self, 'composed', None)
+
         class myPolynomial: pass
         self.polynomial = myPolynomial()
-        
-        self.polynomial.quadratic = [[[0] * self.n for i in range(self.n)] for j in  range(self.n - self.v[0])]
-        self.polynomial.linear = [[0] * self.n for i in range(self.n - self.v[0])]
-        self.polynomial.constant = [0] * (self.n - self.v[0])
 
-        olcount = 0
-        pcount = 0
+        if self.processes and composed is None:
+            from .ParallelKeygen import ParallelKeygen
+
+            # Both stages split by output row over worker processes
+            with Metrics.timer('keygen.composition', processes=self.processes):
+                forms = ParallelKeygen.compose(self.L1, self.b1, self.L2hat, self.F_layers, self.processes)
+            with Metrics.timer('keygen.compaction'):
+                coefficients = rainbowKeygen.compact_forms(forms, self.n)
+            shared = sum(int(np.prod(shape)) for shape in ParallelKeygen.shapes(m, self.n + 1).values())
+            self.buffer_bytes = shared + forms.nbytes + coefficients.nbytes
+            del forms
+        else:
+            if composed is not None:
+                # Composed while solving for the public seed
+                self.polynomial.compact = composed
+                layers = 0
+            else:
+                self.polynomial.compact = np.zeros((m, width), dtype=np.uint8)
+                layers = self.u - 1
 
-        for _i in range(self.u - 1):  
-            
-            layer = _i
-            vl = len(self.F_layers[layer][0]['alphas'][0])
-            ol = len(self.F_layers[layer][0]['betas'])
+            pcount = 0
+
+            for _i in range(layers):  
+                
+                layer = _i
+                vl = len(self.F_layers[layer][0]['alphas'][0])
+                ol = len(self.F_layers[layer][0]['betas'])
 
-            self.generate_polynomial(vl, ol, pcount, self.F_layers[layer], self.polynomial)
+                with Metrics.timer('keygen.polynomial', layer=layer):
+                    self.generate_polynomial(vl, ol, pcount, self.F_layers[layer], self.polynomial)
 
-            pcount += ol
-        
-        # Composition of L1 and F * L2
-        temp_quadratic = [[[0] * self.n for i in range(self.n)] for j in  range(self.n - self.v[0])]
-        temp_linear = [[0] * self.n for i in range(self.n - self.v[0])]
-        temp_constant = [0] * (self.n - self.v[0])
-
-        for i in range(self.n - self.v[0]):
-            for j in range(len(self.L1)):
-                temp_quadratic[i] = GF256.add_matrices(temp_quadratic[i], GF256.multiply_matrix_scalar(self.polynomial.quadratic[j], self.L1[i][j]))
-                temp_linear[i] = GF256.add_vectors(temp_linear[i], GF256.multiply_scalar_vector(self.L1[i][j], self.polynomial.linear[j]))
-                temp_constant[i] = GF256.add(temp_constant[i], GF256.multiply(self.L1[i][j], self.polynomial.constant[j]))
-            temp_constant[i] = GF256.add(temp_constant[i], self.b1[i])
-
-        # Assign the computed values for L1 * F * L2
-        self.polynomial.quadratic = temp_quadratic
-        self.polynomial.linear = temp_linear
-        self.polynomial.constant = temp_constant
-
-        # Compaction
-        compact_quads = list()
-        for i in range(len(self.polynomial.quadratic)):
-            compact_quads.append(list())
-            for j in range(len(self.polynomial.quadratic[i])):
-                for k in range(j, len(self.polynomial.quadratic[i][j])):
-                    if j == k:
-                        compact_quads[-1].append(self.polynomial.quadratic[i][j][k])
-                    else:
-                        compact_quads[-1].append(GF256.add(self.polynomial.quadratic[i][k][j], self.polynomial.quadratic[i][j][k]))
-                        
-
-        pubKey = pubKeyClass()
-        pubKey.n = self.n
-        pubKey.v0 = self.v[0]
-        pubKey.k = self.k
-        pubKey.quads = compact_quads
-        pubKey.linear = self.polynomial.linear
-        pubKey.consts = self.polynomial.constant
+                pcount += ol
+            
+            # Composition of L1 and F * L2 : one linear combination over the compacted rows
+            with Metrics.timer('keygen.composition'):
+                coefficients, temp = rainbowKeygen.mix_rows(self.L1, self.b1, self.polynomial.compact)
+            self.buffer_bytes = self.polynomial.compact.nbytes + coefficients.nbytes + temp + (self.n + 1) ** 2
+            del self.polynomial.compact
+            self.composed = None
+
+        Metrics.gauge('keygen.buffer_bytes', self.buffer_bytes)
+
+        coefficients.setflags(write=False)
+        pubKey = PublicKey(self.n, self.v, self.k, coefficients)
+        if self.compressed:
+            pubKey = CompressedPublicKey.compress(pubKey, self.public_seed)
         self.public_key = pubKey
         
         if save != '':
-            with open(save + 'cvPub.pub', 'wb') as pubFile:
-                dill.dump(pubKey, pubFile)
+            with Metrics.timer('keygen.save_publickey'):
+                if self.compressed:
+                    KeyFile.save_compressed(pubKey, save + 'cvPub.pub')
+                else:
+                    KeyFile.save_publickey(pubKey, save + 'cvPub.pub')
         
         if args.v:
             print("Done")
@@ -290,6 +508,26 @@ class rainbowKeygen:
         if args.v:
             print("Generating private key...")
 
+        privKey = self.private_components()
+        if self.seed is not None:
+            privKey = SeedKey(self.seed, self.v, self.k, privKey, self.compressed)
+        self.private_key = privKey
+
+        if save != '':
+            with Metrics.timer('keygen.save_privatekey'):
+                if self.seed is not None:
+                    KeyFile.save_seedkey(privKey, save + 'cvPriv.pem')
+                else:
+                    KeyFile.save_privatekey(privKey, save + 'cvPriv.pem')
+
+        if args.v:
+            print("Done.")
+
+
+    def private_components(self):
+        '''
+        The generated F, L1 and L2 as a `PrivateKey`.
+        '''
         privKey = privKeyClass()
         privKey.l1 = self.L1
         privKey.l1inv = self.L1inv
@@ -299,228 +537,355 @@ class rainbowKeygen:
         privKey.b2 = self.b2
         privKey.F_layers = self.F_layers
         privKey.k = self.k
-        self.private_key = privKey
-
-        if save != '':
-            with open(save + 'cvPriv.pem', 'wb') as privFile:
-                dill.dump(privKey, privFile)
-
-        if args.v:
-            print("Done.")
-
+        return PrivateKey.from_key(privKey)
 
     def generate_targets(n, v0, k, message):
         '''
         Generates Y or the set of targets from the hash of the message.
+
+        message is the text of the message (hashed as UTF-8), or a bytes-like or open file
+        object, which is hashed incrementally.
         '''
 
-        h = hashlib.new('ripemd160')
-        h.update(bytes(message, encoding='utf-8'))
-        newMessage = h.hexdigest()
+        if isinstance(message, str):
+            newMessage = MessageDigest.hexdigest_text(message)
+        else:
+            newMessage = MessageDigest.hexdigest(message)
         if args.v:
-            print("Hashed message of length", len(message), "to hash length :", len(newMessage))
-        
-        message = newMessage
-        ret = list()
+            print("Hashed message to hash length :", len(newMessage))
 
-        parts = n - v0          # Number of parts to split message into
-        if args.v >= 2:
-            print("Splitting into", parts, "parts.")
-        part = len(message) // (parts + 1)      # Length of each part
-        part += 1
+        return rainbowKeygen.digest_targets(n, v0, newMessage)
 
-        k = 0
-        for i in range(parts):
-            yPart = 0
-            try:
-                for j in range(part):
-                    yPart = yPart | ord(message[k])
-                    k += 1
-            except IndexError:
-                ret.append(yPart)
-                break
-            ret.append(yPart)
+    def message_targets(n, v0, msgFile):
+        '''
+        Generates the targets of the message at msgFile, hashed in binary mode over fixed-size chunks.
 
-        ret.extend([0] * (parts-i-1))
+        msgFile may also be a bytes-like or open file object, see `MessageDigest.digest`.
+        '''
+        return rainbowKeygen.digest_targets(n, v0, MessageDigest.digest(msgFile))
+
+    def digest_targets(n, v0, digest):
+        '''
+        Map a message digest to the n - v0 targets.
+
+        digest is the raw digest (bytes-like) or its hex string. The mapping is :
+            1. h = the lowercase hex string of the digest, of length 2 * len(digest)
+            2. h is cut into consecutive parts of len(h) // (n - v0 + 1) + 1 characters
+            3. target i is the bitwise OR of the ASCII codes of the characters of part i,
+               and targets without any character left are 0
+
+        `sign` and `verify` apply it to the RIPEMD-160 digest of the message (see
+        `MessageDigest`), so sign_digest(key, MessageDigest.digest(msgFile)) gives a signature
+        that verify(key, signature, msgFile) accepts. Any other digest works as long as the
+        signer and the verifier agree on it. The mapping itself is `Formats.digest_targets`,
+        shared with `Verifier`.
+        '''
+        if args.v >= 2:
+            print("Splitting into", n - v0, "parts.")
+        ret = list(Formats.digest_targets(n, v0, digest))
 
         if args.v >= 2:
             print("Message =", ret)
 
         return ret
 
-    def sign(keyFile, msgFile):
+    def digest_targets_batch(n, v0, digests):
+        '''
+        `digest_targets` of every row of a B x d matrix of raw digests, as a B x (n - v0) uint8 matrix.
+        '''
+        digests = GF256np.asfield(digests, "Digest")
+        if digests.ndim != 2 or not digests.shape[1]:
+            raise ValueError("Digests must be a non empty matrix, got shape " + str(digests.shape))
+
+        # Lowercase hex digits of every digest as ASCII codes
+        hexdigits = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+        message = np.stack([hexdigits[digests >> 4], hexdigits[digests & 0x0f]], axis=2).reshape(len(digests), -1)
+
+        parts = n - v0
+        part = message.shape[1] // (parts + 1) + 1
+        width = min(parts * part, message.shape[1])
+
+        # Missing characters are zeros, which leave the ORs unchanged
+        padded = np.zeros((len(digests), parts * part), dtype=np.uint8)
+        padded[:, :width] = message[:, :width]
+        return np.bitwise_or.reduce(padded.reshape(len(digests), parts, part), axis=2)
+
+    def load_key(keyFile):
+        '''
+        Load a public or private key from path, in the binary key format or as a dill pickle.
+        '''
+        if KeyFile.is_keyfile(keyFile):
+            return KeyFile.load(keyFile)
+
+        import dill
+        with open(keyFile, 'rb') as kFile:
+            return dill.load(kFile)
+
+    def load_privatekey(keyFile):
+        '''
+        Load a private key from path as a `PrivateKey`, ready for signing.
+        '''
+        return PrivateKey.from_key(rainbowKeygen.load_key(keyFile))
+
+    def load_publickey(keyFile):
+        '''
+        Load a public key from path, compiled for verification.
+        '''
+        return CompiledPublicKey(rainbowKeygen.load_key(keyFile))
+
+    def public_key(keyFile, timer=None):
+        '''
+        Resolve keyFile to a `CompiledPublicKey`.
+
+        Compiled keys are returned as they are and key objects are compiled. Paths are loaded and
+        compiled once, then kept in `key_cache`; timer names the metric timing that load.
+        '''
+        if isinstance(keyFile, CompiledPublicKey):
+            return keyFile
+        if isinstance(keyFile, public_key_types):
+            return CompiledPublicKey(keyFile)
+        if timer is None:
+            return key_cache.get(keyFile, rainbowKeygen.load_publickey)
+        with Metrics.timer(timer):
+            return key_cache.get(keyFile, rainbowKeygen.load_publickey)
+
+    def private_key(keyFile, timer=None):
+        '''
+        Resolve keyFile to a `PrivateKey`, as `public_key` does for public keys.
+
+        Key objects are frozen (seed keys expanded), paths are loaded once and kept in `key_cache`.
+        '''
+        if isinstance(keyFile, private_key_types):
+            return PrivateKey.from_key(keyFile)
+        if timer is None:
+            return key_cache.get(keyFile, rainbowKeygen.load_privatekey)
+        with Metrics.timer(timer):
+            return key_cache.get(keyFile, rainbowKeygen.load_privatekey)
+
+    def layer_system(F_layer, x, field=GF256np):
+        '''
+        Build the linear system in the oils of one layer once its vinegars x are fixed.
+
+        Returns (equations, consts) such that the layer's central polynomials evaluate to
+        equations * oils + consts.
+        '''
+        vl = len(F_layer[0]['alphas'][0])
+        ol = len(F_layer[0]['betas'])
+        equations = list()
+        consts = list()
+
+        xv = x[:vl]
+        for i in range(ol):
+            poly = F_layer[i]
+
+            # Vinegar-only terms : x^T * alphas * x + gammas[:vl] . x + eta
+            temp = field.multiply_matrix_vector(poly['alphas'], xv)
+            temp = field.add_vectors(temp, poly['gammas'][0][:vl])
+            temp = field.multiply_matrix_vector([temp], xv)[0]
+            consts.append(field.add(temp, poly['etas'][0]))
+
+            # Coefficients of the oils : betas * x + gammas[vl:]
+            temp = field.multiply_matrix_vector(poly['betas'], xv)
+            equations.append(field.add_vectors(temp, poly['gammas'][0][vl:vl+ol]))
+
+        return equations, consts
+
+    def sign(keyFile, msgFile, field=GF256np):
         '''
         Sign message at msgFile with private key at keyFile!
+
+        Keys given by path are kept in `key_cache` and only reloaded when the file changes.
+        msgFile is hashed in binary mode over fixed-size chunks; it may also be a bytes-like or
+        open file object.
+
+        keyFile may also be a `VinegarPool`, in which case the first layer is taken from the
+        pool's precomputed systems and only the remaining layers are solved online.
+        `field` selects the finite field backend used for the arithmetic. The signature is
+        returned as a list of n ints, whichever backend computed it.
         '''
-        
-        if args.v:
-            pass#print("Signing...")
-        # Load private key
-        if isinstance(keyFile, privKeyClass):
-            privKey = keyFile
-            privKey.n = len(privKey.F_layers[-1][0]['alphas'][0]) + len(privKey.F_layers[-1][0]['betas'])
-            privKey.layers = len(privKey.F_layers)
-            if args.v:
-                print("Loading private key from file...")
-        else:
-            with open(keyFile, 'rb') as kFile:
-                privKey = dill.load(kFile)
-                privKey.n = len(privKey.F_layers[-1][0]['alphas'][0]) + len(privKey.F_layers[-1][0]['betas'])
-                privKey.layers = len(privKey.F_layers)
-
-        # Load message (as n dimensional vector)
-        with open(msgFile, 'r') as mFile:
-            message = mFile.read()
-            y = rainbowKeygen.generate_targets(privKey.n, len(privKey.F_layers[0][0]['alphas'][0]), privKey.k, message)
-            if args.v >= 2:
-                print(y)
-        
-        # Apply L1^(-1)
+        with Metrics.timer('sign.hash'):
+            digest = MessageDigest.digest(msgFile)
 
-        ydash = GF256.add_vectors(y, privKey.b1)
-        ydash = GF256.multiply_matrix_vector(privKey.l1inv, ydash)
+        return rainbowKeygen.sign_digest(keyFile, digest, field)
 
-        v0 = len(privKey.F_layers[0][0]['alphas'][0])
+    def sign_digest(keyFile, digest, field=GF256np):
+        '''
+        Sign a precomputed message digest with the private key at keyFile.
 
-        while True:
-            try:
-                # Generate v0 number of random vinegars as x0, x1...xv0
-                x = list()
-                for i in range(len(privKey.F_layers[0][0]['alphas'][0])):
-                    x.append(rainbowKeygen.generate_random_element())
-
-                # Solve polynomials layer by layer, finding ol oils and adding them to vinegars (i.e, x)
-                for layer in range(privKey.layers):
-                    vl = len(privKey.F_layers[layer][0]['alphas'][0])
-                    ol = len(privKey.F_layers[layer][0]['betas'])
-                    equations = [[0] * ol for i in range(ol)]
-                    consts = [0] * ol
-
-                    if args.v >= 2:
-                        print("Layer", layer, "oils", ol, "vinegars", vl)
-                    
-                    for i in range(ol):
-                        for j in range(vl):
-                            for k in range(vl):
-                                consts[i]
-                                privKey.F_layers[layer][i]['alphas'][j][k]
-                                x[j]
-                                x[k]
-                                consts[i] = GF256.add(consts[i], 
-                                    GF256.multiply(
-                                        GF256.multiply(privKey.F_layers[layer][i]['alphas'][j][k], x[j]), 
-                                        x[k])
-                                    )
-
-                        for j in range(ol):
-                            for k in range(vl):
-                                equations[i][j]
-                                privKey.F_layers[layer][i]['betas'][j][k]
-                                x[k]
-                                equations[i][j] = GF256.add(equations[i][j], GF256.multiply(privKey.F_layers[layer][i]['betas'][j][k], x[k]))
-
-                        for j in range(ol+vl):
-                            if j < vl:
-                                consts[i]
-                                privKey.F_layers[layer][i]['gammas'][0][j]
-                                x[j]
-                                consts[i] = GF256.add(consts[i], GF256.multiply(privKey.F_layers[layer][i]['gammas'][0][j], x[j]))
-                            else:
-                                equations[i][j-vl]
-                                privKey.F_layers[layer][i]['gammas'][0][j]
-                                equations[i][j-vl] = GF256.add(equations[i][j-vl], privKey.F_layers[layer][i]['gammas'][0][j])
-
-                        consts[i]
-                        privKey.F_layers[layer][i]['etas'][0]
-                        consts[i] = GF256.add(consts[i], privKey.F_layers[layer][i]['etas'][0])
-
-                    for e in range(len(equations)):
-                        equations[e].append(consts[e])
-
-                    if args.v >= 2:
-                        print(equations, consts)
-                    
-                    start = len(x) - v0
-                    if args.v >= 3:
-                        print(len(ydash))
-                        print(start, len(equations))
-                        print(start+len(equations))
-                        print(len(ydash[start:start+ol]))
-                    solns = GF256.solve_equation(equations, ydash[start:start+ol])
-
-                    for s in solns:
-                        x.append(s)
-
-                # Applying L2 inverse to x
-                signature = GF256.add_vectors(x, privKey.b2)
-                signature = GF256.multiply_matrix_vector(privKey.l2inv, signature)
-
-                if args.v >= 2:
-                    print(signature)
-                break
-            except GF256Errors as e:
-                print("Layer", layer, "of", privKey.layers)
-                print("Restarting with new vinegar! because", e)
-                #raise e
-            except Exception as e:
-                if args.v:
-                    print("Restarting with new vinegar because", e, "!")
-                    #raise e
+        The digest is mapped to the targets by `digest_targets`; keyFile and field are as in `sign`.
+        '''
         
-        if args.v:
-            print("Done.")
+        with Metrics.timer('sign.total'):
+            # Load private key
+            pool = None
+            if isinstance(keyFile, VinegarPool):
+                pool = keyFile
+                privKey = pool.privKey
+                field = pool.field
+            else:
+                privKey = rainbowKeygen.private_key(keyFile, 'sign.key_load')
+
+            # Map the digest to the targets (as n - v0 dimensional vector)
+            with Metrics.timer('sign.targets'):
+                y = rainbowKeygen.digest_targets(privKey.n, len(privKey.F_layers[0][0]['alphas'][0]), digest)
+            
+            # Apply L1^(-1)
+
+            ydash = field.add_vectors(y, privKey.b1)
+            ydash = field.multiply_matrix_vector(privKey.l1inv, ydash)
+
+            v0 = len(privKey.F_layers[0][0]['alphas'][0])
+            restarts = 0
+
+            while True:
+                try:
+                    layer = 0
+                    if pool is not None:
+                        # Layer 0 was prepared offline : only its oils depend on the message
+                        with Metrics.timer('sign.layer', layer=0, pool=True):
+                            x, inverse, consts = pool.get()
+                            ol = len(consts)
+                            solns = field.multiply_matrix_vector(inverse, field.add_vectors(ydash[:ol], consts))
+                            x = list(x)
+                            x.extend(solns)
+                        first = 1
+                    else:
+                        # Generate v0 number of random vinegars as x0, x1...xv0
+                        x = field_random.elements(v0, nonzero=True).tolist()
+                        first = 0
+
+                    # Solve polynomials layer by layer, finding ol oils and adding them to vinegars (i.e, x)
+                    for layer in range(first, privKey.layers):
+                        with Metrics.timer('sign.layer', layer=layer):
+                            ol = len(privKey.F_layers[layer][0]['betas'])
+                            equations, consts = rainbowKeygen.layer_system(privKey.F_layers[layer], x, field)
+
+                            start = len(x) - v0
+                            solns = field.solve_equation(equations, field.add_vectors(ydash[start:start+ol], consts))
+
+                            x.extend(solns)
+
+                    # Applying L2 inverse to x
+                    signature = field.add_vectors(x, privKey.b2)
+                    signature = field.multiply_matrix_vector(privKey.l2inv, signature)
+                    break
+                except GF256Errors as e:
+                    # The layer's linear system is singular for these vinegars
+                    restarts += 1
+                    Metrics.count('sign.restart', layer=layer, reason=str(e))
+
+            Metrics.count('sign.restarts', restarts)
+
+        # A list of ints whatever the backend, as `SigningClient.sign` returns
+        signature = [int(i) for i in signature]
+        if args.v >= 2:
+            print("Signature :", signature, "after", restarts, "restarts")
         return signature
     
     def verify(keyFile, signature, msgFile):
         '''
         Verify the signature using the public key
+
+        keyFile may be a path, a public key object or a `CompiledPublicKey`. When verifying
+        many signatures under one key, compile it once and pass the `CompiledPublicKey`.
+        Keys given by path are compiled once and kept in `key_cache`.
+        msgFile is hashed like in `sign`.
         '''
-        if isinstance(keyFile, pubKeyClass):
-            pubKey = keyFile
-            if args.v:
-                print("Loading public key from file...")
-        else:
-            with open(keyFile, 'rb') as kFile:
-                pubKey = dill.load(kFile)
-
-        pubKey.quadratic = list()
-
-        for _i in pubKey.quads:
-            temp2d = list()
-            for i in range(pubKey.n):
-                temp = list()
-                temp.extend([0] * i)
-                for j in range(pubKey.n - i):
-                    temp.append(_i[j+i])
-                temp2d.append(temp)
-            pubKey.quadratic.append(temp2d)
-
-        with open(msgFile, 'r') as mFile:
-            message = mFile.read()
-            if args.v >= 2:
-                print(message)
-            y = rainbowKeygen.generate_targets(pubKey.n, pubKey.v0, pubKey.k, message)
-
-        ret = [0] * len(pubKey.quads)
-        for p in range(len(pubKey.quads)):
-            offset = 0
-            for q in range(pubKey.n):
-                for r in range(q, pubKey.n):
-                    ret[p] = GF256.add(GF256.multiply(pubKey.quads[p][offset], 
-                                GF256.multiply(signature[q], signature[r])), 
-                            ret[p])
-                    offset += 1
-                ret[p] = GF256.add(ret[p], GF256.multiply(pubKey.linear[p][q], signature[q]))
-            ret[p] = GF256.add(ret[p], pubKey.consts[p])
+        with Metrics.timer('verify.hash'):
+            digest = MessageDigest.digest(msgFile)
 
-    
-        for i, a, b in zip(range(len(ret)), ret, y):
-            if args.v >= 2:
-                print(i, a, b, a==b)
-            if a != b:
-                return False
-        
-        return True
+        return rainbowKeygen.verify_digest(keyFile, signature, digest)
+
+    def verify_digest(keyFile, signature, digest):
+        '''
+        Verify the signature of a precomputed message digest, mapped to the targets by `digest_targets`.
+        '''
+        with Metrics.timer('verify.total'):
+            pubKey = rainbowKeygen.public_key(keyFile, 'verify.key_load')
+
+            with Metrics.timer('verify.targets'):
+                y = rainbowKeygen.digest_targets(pubKey.n, pubKey.v0, digest)
+
+            with Metrics.timer('verify.evaluate'):
+                return pubKey.verify(signature, y)
+
+    def verify_batch(keyFile, signatures, msgFiles):
+        '''
+        Verify many (signature, message) pairs under one public key.
+
+        keyFile is loaded and compiled once, the targets of every message are derived up front and
+        all signatures are checked in one vectorised pass. Returns a boolean numpy array with one
+        entry per pair.
+        '''
+        pubKey = rainbowKeygen.public_key(keyFile, 'verify_batch.key_load')
+
+        if len(signatures) != len(msgFiles):
+            raise ValueError("Need one message per signature! " + str(len(signatures)) + " vs " + str(len(msgFiles)))
+
+        targets = list()
+        with Metrics.timer('verify_batch.targets', size=len(msgFiles)):
+            for msgFile in msgFiles:
+                targets.append(rainbowKeygen.message_targets(pubKey.n, pubKey.v0, msgFile))
+
+        if not targets:
+            return np.zeros(0, dtype=bool)
+
+        with Metrics.timer('verify_batch.evaluate', size=len(targets)):
+            return pubKey.verify_batch(signatures, targets)
+
+    def sign_many(keyFile, msgFiles, field=GF256np, workers=None, executor=None):
+        '''
+        Sign many messages with one private key on a thread pool.
+
+        Parameters:
+            keyFile - Path, key object or `VinegarPool`, loaded once and shared by all threads
+            msgFiles - Messages, each anything `sign` accepts
+            workers - Number of threads of the pool created when no executor is given
+            executor - A `concurrent.futures` executor to run the signatures on
+
+        Keys are immutable, so the threads share one key without locking. Hashing and the numpy
+        field kernels release the GIL for large inputs. Returns the signatures in order.
+        '''
+        if not isinstance(keyFile, VinegarPool):
+            keyFile = rainbowKeygen.private_key(keyFile)
+
+        if executor is not None:
+            return list(executor.map(lambda msgFile: rainbowKeygen.sign(keyFile, msgFile, field), msgFiles))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda msgFile: rainbowKeygen.sign(keyFile, msgFile, field), msgFiles))
+
+    def verify_many(keyFile, signatures, msgFiles, workers=None, executor=None, chunk=256):
+        '''
+        Verify many (signature, message) pairs under one public key on a thread pool.
+
+        The messages are hashed concurrently, then the signatures are checked with
+        `CompiledPublicKey.verify_batch` in chunks of `chunk` pairs spread over the same pool.
+        workers and executor are as in `sign_many`. Returns a list of booleans, one per pair.
+        '''
+        pubKey = rainbowKeygen.public_key(keyFile)
+
+        signatures, msgFiles = list(signatures), list(msgFiles)
+        if len(signatures) != len(msgFiles):
+            raise ValueError("Need one message per signature! " + str(len(signatures)) + " vs " + str(len(msgFiles)))
+        if not signatures:
+            return list()
+
+        def targets(msgFile):
+            return rainbowKeygen.message_targets(pubKey.n, pubKey.v0, msgFile)
+
+        def check(begin):
+            return pubKey.verify_batch(signatures[begin:begin + chunk], y[begin:begin + chunk])
+
+        pool = executor if executor is not None else ThreadPoolExecutor(max_workers=workers)
+        try:
+            y = list(pool.map(targets, msgFiles))
+            ret = list()
+            for ok in pool.map(check, range(0, len(signatures), chunk)):
+                ret.extend(bool(i) for i in ok)
+            return ret
+        finally:
+            if executor is None:
+                pool.shutdown()
 
     def generate_keys(self, save=''):
         '''
@@ -543,18 +908,120 @@ class rainbowKeygen:
             print("Generated private key")
 
     def save_signature(signature, sfile='rSignature'):
-        with open(sfile, 'wb') as opFile:
-            dill.dump(signature, opFile)
+        '''
+        Write a signature to sfile in the fixed-length binary format of `SignatureFile`.
+        '''
+        SignatureFile.save(signature, sfile)
 
     def load_signature(sfile='rSignature'):
-        with open(sfile, 'wb') as ipFile:
-            signature = dill.load(opFile)
+        '''
+        Load a signature saved by `save_signature`, or pickled with dill by earlier versions.
+        '''
+        if SignatureFile.is_signature_file(sfile):
+            return SignatureFile.load(sfile)
+
+        import dill
+        with open(sfile, 'rb') as ipFile:
+            signature = dill.load(ipFile)
 
         return signature
 
 
+class VinegarPool:
+
+    def __init__(self, keyFile, size=64, field=GF256np):
+        '''
+        Pool of precomputed first-layer systems for offline/online signing.
+
+        Parameters:
+            keyFile - Private key object or path to the private key
+            size - Maximum number of precomputed systems kept in the pool, at least 1
+            field - Finite field backend used for the arithmetic
+
+        The vinegars of layer 0, and therefore its coefficient matrix and constant terms, do not
+        depend on the message. Each pool entry holds a random vinegar assignment together with the
+        inverse of its layer 0 matrix and its constants; singular draws are discarded here instead
+        of restarting a signature. Pass the pool to `rainbowKeygen.sign` in place of the key.
+        '''
+        # queue.Queue(maxsize=0) is unbounded : the producer would never stop filling it
+        if size < 1:
+            raise ValueError("Pool size must be at least 1, got " + str(size))
+
+        self.privKey = rainbowKeygen.private_key(keyFile)
+
+        self.field = field
+        self.entries = queue.Queue(maxsize=size)
+        self.stopped = threading.Event()
+        self.producer = None
+
+    def generate(self):
+        '''
+        Draw vinegars until the layer 0 system is invertible and return (vinegars, inverse, consts).
+        '''
+        v0 = len(self.privKey.F_layers[0][0]['alphas'][0])
+        with Metrics.timer('pool.generate'):
+            while True:
+                x = field_random.elements(v0, nonzero=True).tolist()
+                equations, consts = rainbowKeygen.layer_system(self.privKey.F_layers[0], x, self.field)
+                try:
+                    return x, self.field.find_inverse(equations), consts
+                except GF256Errors:
+                    Metrics.count('pool.singular')
+
+    def produce(self):
+        '''
+        Keep the pool full until `stop` is called.
+        '''
+        entry = None
+        while not self.stopped.is_set():
+            if entry is None:
+                entry = self.generate()
+            try:
+                self.entries.put(entry, timeout=0.1)
+                entry = None
+            except queue.Full:
+                pass
+
+    def start(self):
+        '''
+        Start the background producer thread.
+        '''
+        if self.producer is None or not self.producer.is_alive():
+            self.stopped.clear()
+            self.producer = threading.Thread(target=self.produce, daemon=True)
+            self.producer.start()
+        return self
+
+    def stop(self):
+        '''
+        Stop the background producer thread.
+        '''
+        self.stopped.set()
+        if self.producer is not None:
+            self.producer.join()
+            self.producer = None
+
+    def get(self):
+        '''
+        Take one precomputed entry, computing it on the spot if the pool has run dry.
+
+        Entries are never handed out twice : reusing vinegars across signatures leaks the key.
+        '''
+        try:
+            return self.entries.get_nowait()
+        except queue.Empty:
+            Metrics.count('pool.miss')
+            return self.generate()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
 if __name__ == '__main__':
-    print('CryptoVinaigrette is now a package! Please use `pip install cryptovinaigrette` and `from cryptovinaigrette import cryptovinaigrette` then `myKeyObject = cryptovinaigrette.rainbowKeygen()`')
+    print('CryptoVinaigrette is now a package! Please use `pip install cryptovinaigrette` and `from cryptovinaigrette import cryptovinaigrette` then `myKeyObject = cryptovinaigrette.rainbowKeygen()`, or run the `cryptovinaigrette` command (see `cryptovinaigrette --help`)')
     # myKeyObject = rainbowKeygen(save='rainbowTest')
     
     # start = dt.now()
@@ -17,8 +17,17 @@ setuptools.setup(
 	long_description_content_type="text/markdown",
 	url="https://github.com/aditisrinivas97/Crypto-Vinaigrette",
 	packages=setuptools.find_packages(),
+	python_requires=">=3.8",
+	entry_points={
+		"console_scripts": ["cryptovinaigrette = cryptovinaigrette.CommandLine:main"],
+	},
 	classifiers=[
-		"Programming Language :: Python :: 3.6",
+		"Programming Language :: Python :: 3",
+		"Programming Language :: Python :: 3 :: Only",
+		"Programming Language :: Python :: 3.8",
+		"Programming Language :: Python :: 3.9",
+		"Programming Language :: Python :: 3.10",
+		"Programming Language :: Python :: 3.11",
 		"License :: OSI Approved :: MIT License",
 		"Operating System :: OS Independent",
 	],
@@ -0,0 +1,209 @@
+'''
+Benchmark keygen, sign and verify over a sweep of (n, u) parameter sets or named presets.
+
+Usage:
+    python benchmark.py --params 16:3 32:5 --repeat 20 --output run.json
+    python benchmark.py --params cv-64 rainbow-Ia
+    python benchmark.py --params 32:5 --compare run.json
+
+Results are emitted as JSON. They include the cold start of `cryptovinaigrette.Verifier` and of
+`cryptovinaigrette.cryptovinaigrette`, each imported --imports times in a fresh interpreter. With --compare, every timing is printed next to the
+matching timing of an earlier run and the script exits with status 1 if any of
+them got slower by more than --threshold.
+'''
+
+from context import cryptovinaigrette
+from cryptovinaigrette import cryptovinaigrette
+from cryptovinaigrette.Metrics import Recorder
+import argparse, json, os, platform, statistics, subprocess, sys, tempfile, time, tracemalloc
+import numpy as np
+
+msgFile = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'testFile.txt')
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules whose cold import time is tracked
+imports = {'verifier': 'cryptovinaigrette.Verifier', 'cryptovinaigrette': 'cryptovinaigrette.cryptovinaigrette'}
+
+def timed(f, *args):
+    start = time.perf_counter()
+    ret = f(*args)
+    return ret, time.perf_counter() - start
+
+def summary(times):
+    times = sorted(times)
+    return {
+        'mean': statistics.mean(times),
+        'p50': times[len(times) // 2],
+        'p99': times[min(len(times) - 1, int(len(times) * 0.99))],
+        'max': times[-1],
+    }
+
+def bench_keygen(options, k, save):
+    '''
+    Time the phases of `rainbowKeygen.__init__` through the metrics hooks.
+    '''
+    with Recorder() as recorder:
+        key = cryptovinaigrette.rainbowKeygen(k=k, save=save, **options)
+    phases = {name[len('keygen.'):]: value for name, value in recorder.totals('keygen.').items()}
+
+    tracemalloc.start()
+    cryptovinaigrette.rainbowKeygen(k=k, **options)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return key, phases, peak
+
+def bench_sign(key, save, repeat):
+    signatures, times = list(), list()
+    with Recorder() as recorder:
+        for i in range(repeat):
+            signature, t = timed(cryptovinaigrette.rainbowKeygen.sign, key.private_key, msgFile)
+            signatures.append(signature)
+            times.append(t)
+    ret = summary(times)
+    ret['retries'] = recorder.total('sign.restarts')
+    ret['phases'] = {name[len('sign.'):]: value / repeat for name, value in recorder.totals('sign.').items() if not name.startswith('sign.restart')}
+
+    cryptovinaigrette.key_cache.clear()
+    ret['from_path_cold'] = timed(cryptovinaigrette.rainbowKeygen.sign, save + 'cvPriv.pem', msgFile)[1]
+    ret['from_path_warm'] = timed(cryptovinaigrette.rainbowKeygen.sign, save + 'cvPriv.pem', msgFile)[1]
+
+    tracemalloc.start()
+    cryptovinaigrette.rainbowKeygen.sign(key.private_key, msgFile)
+    ret['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return signatures, ret
+
+def bench_verify(key, save, signatures):
+    compiled = cryptovinaigrette.CompiledPublicKey(key.public_key)
+    times = [timed(cryptovinaigrette.rainbowKeygen.verify, compiled, s, msgFile)[1] for s in signatures]
+    ret = summary(times)
+
+    y = cryptovinaigrette.rainbowKeygen.generate_targets(compiled.n, compiled.v0, compiled.k, open(msgFile).read())
+    batch = np.tile(np.asarray(signatures, dtype=np.uint8), (max(1, 1000 // len(signatures)), 1))
+    ok, t = timed(compiled.verify_batch, batch, np.tile(y, (len(batch), 1)))
+    ret['batch_per_signature'] = t / len(batch)
+    ret['all_valid'] = bool(ok.all())
+
+    cryptovinaigrette.key_cache.clear()
+    ret['from_path_cold'] = timed(cryptovinaigrette.rainbowKeygen.verify, save + 'cvPub.pub', signatures[0], msgFile)[1]
+    ret['from_path_warm'] = timed(cryptovinaigrette.rainbowKeygen.verify, save + 'cvPub.pub', signatures[0], msgFile)[1]
+    return ret
+
+def bench_load(save):
+    ret = dict()
+    pubKey, ret['public'] = timed(cryptovinaigrette.KeyFile.load, save + 'cvPub.pub')
+    _, ret['public_compile'] = timed(cryptovinaigrette.CompiledPublicKey, pubKey)
+    _, ret['private'] = timed(cryptovinaigrette.KeyFile.load, save + 'cvPriv.pem')
+    ret['public_bytes'] = os.path.getsize(save + 'cvPub.pub')
+    ret['private_bytes'] = os.path.getsize(save + 'cvPriv.pem')
+    return ret
+
+def bench_import(module, repeat):
+    '''
+    Time `import module` in repeat fresh interpreters, so that nothing is cached in sys.modules.
+    '''
+    code = 'import time; start = time.perf_counter(); import ' + module + '; print(time.perf_counter() - start)'
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    times = [float(subprocess.check_output([sys.executable, '-c', code], env=env)) for i in range(repeat)]
+    return summary(times)
+
+def run(params, repeat, k=8, import_repeat=10):
+    results = list()
+    for name in params:
+        if name in cryptovinaigrette.presets:
+            options = {'params': name}
+        else:
+            n, u = (int(i) for i in name.split(':'))
+            options = {'n': n, 'u': u}
+        save = tempfile.mkdtemp() + os.sep
+        key, phases, peak = bench_keygen(options, k, save)
+        signatures, sign = bench_sign(key, save, repeat)
+        results.append({
+            'name': name,
+            'n': key.n,
+            'u': key.u,
+            'v': [int(i) for i in key.v],
+            'keygen': phases,
+            'keygen_peak_bytes': peak,
+            'sign': sign,
+            'verify': bench_verify(key, save, signatures),
+            'load': bench_load(save),
+        })
+        print(name, "done", file=sys.stderr)
+
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'repeat': repeat,
+        'imports': {name: bench_import(module, import_repeat) for name, module in imports.items()},
+        'results': results,
+    }
+
+def timings(node, prefix=''):
+    '''
+    Flatten every timing (seconds) of a result into {dotted.name : value}.
+    '''
+    ret = dict()
+    for key, value in node.items():
+        if isinstance(value, dict):
+            ret.update(timings(value, prefix + key + '.'))
+        elif isinstance(value, float) and not key.endswith('bytes'):
+            ret[prefix + key] = value
+    return ret
+
+def label(result):
+    return result.get('name', str(result['n']) + ':' + str(result['u']))
+
+def compare_timings(current, baseline, threshold):
+    '''
+    Print the timings of current next to those of baseline, returning True if any got slower.
+    '''
+    regressed = False
+    for name, value in sorted(timings(current).items()):
+        before = timings(baseline).get(name)
+        if not before:
+            continue
+        ratio = value / before
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  <-- slower'
+            regressed = True
+        print("    %-32s %10.6f %10.6f %6.2fx%s" % (name, before, value, ratio, flag))
+    return regressed
+
+def compare(current, baseline, threshold):
+    old = {label(r): r for r in baseline['results']}
+    regressed = False
+    if 'imports' in baseline:
+        print("imports")
+        regressed |= compare_timings(current['imports'], baseline['imports'], threshold)
+    for r in current['results']:
+        if label(r) not in old:
+            continue
+        print(label(r), "n =", r['n'], "u =", r['u'])
+        regressed |= compare_timings(r, old[label(r)], threshold)
+    return regressed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--params', nargs='+', default=['16:3', '32:5'], help='n:u pairs or preset names to sweep')
+    parser.add_argument('--repeat', type=int, default=20, help='signatures per parameter set')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--imports', type=int, default=10, help='fresh interpreters timing each import')
+    parser.add_argument('--threshold', type=float, default=0.25, help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    current = run(args.params, args.repeat, import_repeat=args.imports)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+    else:
+        print(json.dumps(current, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            sys.exit(1 if compare(current, json.load(f), args.threshold) else 0)
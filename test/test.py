@@ -2,6 +2,7 @@
 from context import cryptovinaigrette
 from cryptovinaigrette import cryptovinaigrette
 from datetime import datetime as dt
+import os
 
 __RED = "\033[0;31m"
 __GREEN = "\033[0;32m"
@@ -54,7 +55,7 @@ if args.v >= 2:
 print()
 print("Checking testFile2.txt")
 start = dt.now()
-print("Signature verification with tampered file :", colored_binary(cryptovinaigrette.rainbowKeygen.verify('rPub.rkey', signature, 'testFile2.txt')))
+print("Signature verification with tampered file :", colored_binary(cryptovinaigrette.rainbowKeygen.verify('cvPub.pub', signature, 'testFile2.txt')))
 end = dt.now()
 if args.v:
     print("Verified signature in", end - start, "seconds")
@@ -62,3 +63,39 @@ if args.v:
 if args.v >= 2:
     print("Signature :", signature)
 
+
+# Nonsingular, but with a zero on the diagonal : needs a row swap
+zeroPivot, zeroPivotTargets = [[0, 2, 1], [3, 0, 5], [1, 1, 0]], [7, 9, 11]
+# Second row is 2 * the first
+singular = [[1, 2], [2, 4]]
+for field in (cryptovinaigrette.GF256, cryptovinaigrette.GF256np):
+    x = field.solve_equation(zeroPivot, zeroPivotTargets)
+    print()
+    print(field.__name__, "solves a system with a zero pivot :", colored_binary(list(field.multiply_matrix_vector(zeroPivot, x)) == zeroPivotTargets))
+    try:
+        field.solve_equation(singular, [1, 1])
+        raised = False
+    except cryptovinaigrette.GF256Errors as e:
+        raised = "Rank 1 of 2" in str(e)
+    print(field.__name__, "rejects a singular system with its rank :", colored_binary(raised))
+
+from cryptovinaigrette.Verifier import Verifier
+compressedKey = cryptovinaigrette.rainbowKeygen(n=32, u=5, seed=True, compressed=True)
+cryptovinaigrette.KeyFile.save_compressed(compressedKey.public_key, 'cvPubCompressed.pub')
+compressedSignature = cryptovinaigrette.rainbowKeygen.sign(compressedKey.private_key, 'testFile.txt')
+for keyFile, sig in (('cvPub.pub', signature), ('cvPubCompressed.pub', compressedSignature)):
+    verifier = Verifier(keyFile)
+    tampered = list(sig)
+    tampered[0] ^= 1
+    cases = ((sig, 'testFile.txt'), (sig, 'testFile2.txt'), (tampered, 'testFile.txt'))
+    agree = all(verifier.verify(s, m) == cryptovinaigrette.rainbowKeygen.verify(keyFile, s, m) for s, m in cases)
+    print()
+    print("Verifier agrees with rainbowKeygen.verify on", keyFile, ":", colored_binary(agree and verifier.verify(sig, 'testFile.txt')))
+os.remove('cvPubCompressed.pub')
+
+print()
+print("Rewriting cvPub.pub while a key loaded from it is in use")
+loadedKey = cryptovinaigrette.KeyFile.load('cvPub.pub')
+before = loadedKey.coefficients.tobytes()
+cryptovinaigrette.rainbowKeygen(n=16, u=3, save='./')
+print("Loaded key unchanged :", colored_binary(loadedKey.coefficients.tobytes() == before))